@@ -0,0 +1,157 @@
+import json
+import sqlite3
+import sys
+import uuid
+from datetime import datetime
+
+CATALOG_PATH = 'results/catalog.db'
+
+# Configuration fields stored as their own indexed columns
+CONFIG_COLUMNS = {
+    'operator_type': 'INTEGER',
+    'total_fish_to_sell': 'INTEGER',
+    'num_basic_merchants': 'INTEGER',
+    'num_rich_merchants': 'INTEGER',
+    'num_poor_merchants': 'INTEGER',
+    'lot_supply': 'TEXT',
+    'price_clock': 'TEXT',
+    'seed': 'INTEGER'
+}
+
+# Summary statistics stored per run (see pricing.clock_report)
+SUMMARY_COLUMNS = {
+    'lots': 'INTEGER',
+    'sold': 'INTEGER',
+    'ticks': 'INTEGER',
+    'ticks_per_sold_lot': 'REAL',
+    'revenue': 'INTEGER',
+    'mean_price': 'REAL'
+}
+
+INDEXES = {
+    'idx_runs_merchants': ('operator_type', 'num_basic_merchants', 'num_rich_merchants', 'num_poor_merchants'),
+    'idx_runs_clock': ('price_clock', 'lot_supply'),
+    'idx_runs_seed': ('seed',),
+    'idx_runs_started': ('started_at',)
+}
+
+
+def new_run_id():
+    """
+    Returns a run id that is unique even for runs started in the same second.
+    """
+    return f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def open_catalog(path=CATALOG_PATH):
+    """
+    Opens (and creates if needed) the run catalog database.
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    columns = ', '.join(
+        f'{name} {kind}' for name, kind in {**CONFIG_COLUMNS, **SUMMARY_COLUMNS}.items()
+    )
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS runs ('
+        f'run_id TEXT PRIMARY KEY, started_at TEXT, {columns}, '
+        f'config TEXT, transactions_path TEXT)'
+    )
+    for index, fields in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON runs ({', '.join(fields)})")
+    conn.commit()
+    return conn
+
+
+def normalize_config(config):
+    """
+    Converts the raw string values read from config.txt to the catalog's column types.
+    """
+    normalized = {}
+    for name, kind in CONFIG_COLUMNS.items():
+        value = config.get(name)
+        if value in (None, ''):
+            normalized[name] = None
+        elif kind == 'INTEGER':
+            normalized[name] = int(value)
+        else:
+            normalized[name] = str(value)
+    return normalized
+
+
+def record_run(conn, run_id, config, summary, transactions_path):
+    """
+    Stores a finished run: its configuration, summary statistics and a
+    pointer to the file holding its transactions.
+    """
+    row = {
+        'run_id': run_id,
+        'started_at': run_id.rsplit('_', 1)[0],
+        **normalize_config(config),
+        **{name: summary.get(name) for name in SUMMARY_COLUMNS},
+        'config': json.dumps(config, sort_keys=True),
+        'transactions_path': transactions_path
+    }
+    placeholders = ', '.join('?' for _ in row)
+    conn.execute(f"INSERT OR REPLACE INTO runs ({', '.join(row)}) VALUES ({placeholders})", list(row.values()))
+    conn.commit()
+
+
+def where_clause(filters):
+    """
+    Builds a parameterized WHERE clause from column=value filters.
+    """
+    for name in filters:
+        if name not in CONFIG_COLUMNS and name not in SUMMARY_COLUMNS and name != 'run_id':
+            raise ValueError(f"Unknown catalog column: {name}")
+    if not filters:
+        return '', []
+    return 'WHERE ' + ' AND '.join(f'{name} = ?' for name in filters), list(filters.values())
+
+
+def find_runs(conn, **filters):
+    """
+    Returns the runs matching every filter, newest first.
+    Example: find_runs(conn, num_poor_merchants=2, operator_type=4)
+    """
+    where, params = where_clause(filters)
+    rows = conn.execute(f'SELECT * FROM runs {where} ORDER BY started_at DESC', params)
+    return [dict(row) for row in rows]
+
+
+def aggregate_runs(conn, group_by=(), **filters):
+    """
+    Returns cross-run aggregates (run count, mean revenue, ticks and price),
+    optionally grouped by configuration columns.
+    """
+    for name in group_by:
+        if name not in CONFIG_COLUMNS:
+            raise ValueError(f"Cannot group by: {name}")
+    where, params = where_clause(filters)
+    group_columns = ', '.join(group_by)
+    select_group = f'{group_columns}, ' if group_by else ''
+    group = f'GROUP BY {group_columns}' if group_by else ''
+    rows = conn.execute(
+        f'SELECT {select_group}COUNT(*) AS runs, AVG(revenue) AS mean_revenue, '
+        f'AVG(ticks_per_sold_lot) AS mean_ticks_per_sold_lot, AVG(mean_price) AS mean_price, '
+        f'SUM(sold) AS total_sold FROM runs {where} {group}',
+        params
+    )
+    return [dict(row) for row in rows]
+
+
+if __name__ == '__main__':
+    # Usage: python catalog.py [column=value ...]
+    query = {}
+    for argument in sys.argv[1:]:
+        name, value = argument.split('=', 1)
+        query[name] = int(value) if value.lstrip('-').isdigit() else value
+    catalog = open_catalog()
+    for run in find_runs(catalog, **query):
+        print(
+            f"{run['run_id']}: operator {run['operator_type']}, merchants "
+            f"{run['num_basic_merchants']}/{run['num_rich_merchants']}/{run['num_poor_merchants']}, "
+            f"sold {run['sold']}/{run['lots']}, revenue {run['revenue']}, "
+            f"transactions {run['transactions_path']}"
+        )
+    print(aggregate_runs(catalog, **query))
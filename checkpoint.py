@@ -0,0 +1,133 @@
+import csv
+import os
+import pickle
+import threading
+
+TRANSACTION_FIELDS = ['Product', 'SellPrice', 'Merchant', 'Ticks']
+
+
+class CheckpointWriter:
+    """
+    Writes session snapshots from a background thread so the runner never
+    blocks on disk.
+
+    Each snapshot holds operator and merchant state. Transactions go to an
+    append-only journal next to the snapshot, so every checkpoint only
+    writes the transactions added since the previous one. If the writer
+    falls behind, intermediate snapshots are skipped but their transactions
+    are kept.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.journal_path = path + '.transactions.csv'
+        self.condition = threading.Condition()
+        self.pending_state = None
+        self.pending_transactions = []
+        self.transactions_submitted = 0
+        self.transactions_written = 0
+        self.closed = False
+        if resume:
+            self.transactions_written = self.transactions_submitted = len(load_checkpoint(path)['transactions'])
+            truncate_journal(self.journal_path, self.transactions_written)
+        elif os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, state, new_transactions):
+        """
+        Queues a snapshot with the transactions recorded since the last one.
+        """
+        with self.condition:
+            self.pending_state = state
+            self.pending_transactions.extend(new_transactions)
+            self.transactions_submitted += len(new_transactions)
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending_state is None and not self.closed:
+                    self.condition.wait()
+                if self.pending_state is None:
+                    return
+                state, transactions = self.pending_state, self.pending_transactions
+                self.pending_state, self.pending_transactions = None, []
+            self.write(state, transactions)
+
+    def write(self, state, transactions):
+        # Journal first: a crash before the snapshot is replaced only leaves
+        # extra journal rows, which load_checkpoint ignores
+        if transactions:
+            with open(self.journal_path, 'a', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=TRANSACTION_FIELDS)
+                writer.writerows(transactions)
+        self.transactions_written += len(transactions)
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump({**state, 'transactions_written': self.transactions_written}, file)
+        os.replace(temporary_path, self.path)
+
+    def close(self, remove=False):
+        """
+        Flushes the last snapshot and stops the writer. With remove=True the
+        checkpoint files are deleted, for sessions that finished cleanly.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        if remove:
+            for path in (self.path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def read_journal(journal_path, count):
+    transactions = []
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file, fieldnames=TRANSACTION_FIELDS)
+            for row in reader:
+                if len(transactions) == count:
+                    break
+                transactions.append({
+                    'Product': int(row['Product']),
+                    'SellPrice': int(row['SellPrice']),
+                    'Merchant': 0 if row['Merchant'] == '0' else row['Merchant'],
+                    'Ticks': int(row['Ticks'])
+                })
+    return transactions
+
+
+def truncate_journal(journal_path, count):
+    """
+    Drops journal rows written after the last complete snapshot.
+    """
+    transactions = read_journal(journal_path, count)
+    with open(journal_path, 'w', newline='', encoding='utf-8') as file:
+        csv.DictWriter(file, fieldnames=TRANSACTION_FIELDS).writerows(transactions)
+
+
+def load_checkpoint(path):
+    """
+    Loads a snapshot together with the transactions it covers.
+    """
+    with open(path, 'rb') as file:
+        state = pickle.load(file)
+    state['transactions'] = read_journal(path + '.transactions.csv', state['transactions_written'])
+    return state
+
+
+def reconcile_merchants(merchant_states, fish_index):
+    """
+    Rolls back purchases of lots after `fish_index`. Merchants are read after
+    the operator, so a merchant can hold a fish the operator snapshot has not
+    closed yet. That lot will be auctioned again on resume.
+    """
+    for state in merchant_states:
+        for product_number in [p for p in state['inventory'] if p > fish_index]:
+            item = state['inventory'].pop(product_number)
+            state['budget'] += item['price']
+            state['inventory_counts'][item['type']] -= 1
@@ -0,0 +1,125 @@
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+LOG_LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING, 'off': logging.CRITICAL + 10}
+LEVEL_NAMES = {logging.DEBUG: 'DEBUG', logging.INFO: 'INFO', logging.WARNING: 'WARNING'}
+
+# Defaults used by agents started without 'log_options'
+LOG_DEFAULTS = {'mode': 'queued', 'level': 'info', 'rate_limit': 0, 'directory': None}
+
+
+class EventLog:
+    """
+    In-memory log queue drained by a background writer thread.
+
+    Handlers only append a compact record (timestamp, level, event, template,
+    args); formatting and I/O happen in the writer, one write per batch. With
+    `rate_limit` set, each event keeps at most that many records per second
+    and the writer reports how many it dropped.
+    """
+
+    def __init__(self, agent_name, stream=None, rate_limit=0, batch_size=256, flush_interval=0.2):
+        self.agent_name = agent_name
+        self.stream = stream or sys.stdout
+        self.rate_limit = rate_limit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records = collections.deque()  # Appends and pops are thread-safe
+        self.window = {}  # event -> (second, records kept in that second)
+        self.suppressed = collections.Counter()
+        self.write_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def push(self, level, event, template, args):
+        if self.rate_limit:
+            second = int(time.time())
+            window_second, count = self.window.get(event, (second, 0))
+            if window_second != second:
+                count = 0
+            if count >= self.rate_limit:
+                self.suppressed[event] += 1
+                return
+            self.window[event] = (second, count + 1)
+        self.records.append((time.time(), level, event, template, args))
+        if len(self.records) >= self.batch_size:
+            self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def format(self, record):
+        timestamp, level, event, template, args = record
+        message = template.format(*args) if args else template
+        return f"{LEVEL_NAMES[level]} [{datetime.utcfromtimestamp(timestamp)}] ({self.agent_name}): {message}\n"
+
+    def flush(self):
+        """
+        Writes every queued record. Safe to call from any thread.
+        """
+        with self.write_lock:
+            lines = []
+            while self.records:
+                lines.append(self.format(self.records.popleft()))
+            if self.suppressed:
+                suppressed, self.suppressed = self.suppressed, collections.Counter()
+                for event, count in list(suppressed.items()):
+                    lines.append(self.format(
+                        (time.time(), logging.INFO, event, "Rate limit dropped {} '{}' records.", (count, event))
+                    ))
+            if lines:
+                self.stream.write(''.join(lines))
+                self.stream.flush()
+
+
+class EventLogging:
+    """
+    Mixin giving agents log_event, a cheap replacement for log_info in
+    message handlers. Settings come from the 'log_options' attribute
+    (see LOG_DEFAULTS): mode 'queued' uses an EventLog, mode 'osbrain'
+    formats at once and goes through the agent's log_info/log_debug.
+    """
+
+    def setup_event_log(self):
+        options = {**LOG_DEFAULTS, **getattr(self, 'log_options', {})}
+        self.log_threshold = LOG_LEVELS[options['level']]
+        self.event_log = None
+        if options['mode'] == 'queued':
+            stream = None
+            if options['directory']:
+                # One file per agent, so batches from different agents never interleave
+                os.makedirs(options['directory'], exist_ok=True)
+                stream = open(os.path.join(options['directory'], f'{self.name}.log'), 'a', encoding='utf-8')
+            self.event_log = EventLog(self.name, stream, int(options['rate_limit']))
+
+    def log_event(self, event, template, *args, level=logging.INFO):
+        """
+        Logs `template.format(*args)` under the name `event`. Formatting is
+        deferred to the writer thread in queued mode.
+        """
+        if level < self.log_threshold:
+            return
+        if self.event_log is not None:
+            self.event_log.push(level, event, template, args)
+        elif level == logging.DEBUG:
+            self.log_debug(template.format(*args))
+        elif level == logging.WARNING:
+            self.log_warning(template.format(*args))
+        else:
+            self.log_info(template.format(*args))
+
+    def flush_log(self):
+        """
+        Writes out queued records; the runner calls it before shutting agents down.
+        """
+        if self.event_log is not None:
+            self.event_log.flush()
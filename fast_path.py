@@ -0,0 +1,254 @@
+import argparse
+import copy
+import itertools
+import math
+import random
+import time
+from strategies import get_strategy
+from supply import FISH_TYPES, FISH_QUALITIES, BOTTOM_PRICE, build_supply
+
+# Starting state of each merchant class (see merchants.py)
+MERCHANT_CLASSES = {
+    'BasicMerchant': {'budget': 100, 'strategy': 'basic', 'preferred_price_threshold': None},
+    'RichMerchant': {'budget': 500, 'strategy': 'rich', 'preferred_price_threshold': 30},
+    'PoorMerchant': {'budget': 50, 'strategy': 'poor', 'preferred_price_threshold': 15}
+}
+
+
+def merchant_state(name, merchant_class, preference, budget=None, strategy=None):
+    """
+    Builds the state a freshly started merchant decides on (see Merchant.strategy_state).
+    """
+    defaults = MERCHANT_CLASSES[merchant_class]
+    return {
+        'name': name,
+        'strategy': strategy or defaults['strategy'],
+        'budget': defaults['budget'] if budget is None else budget,
+        'preference': preference,
+        'inventory_counts': {fish_type: 0 for fish_type in FISH_TYPES},
+        'preferred_price_thresholds': {'good': 30, 'normal': 20, 'bad': 10},
+        'preferred_price_minimums': {'good': 10, 'normal': 10, 'bad': 10},
+        'preferred_price_threshold': defaults['preferred_price_threshold']
+    }
+
+
+def price_grid(lot):
+    """
+    The fixed clock's prices for a lot, as (start price, decrement, number of ticks).
+    """
+    ticks = max(1, int((lot['start_price'] - lot['bottom_price']) // lot['price_decrement']) + 1)
+    return lot['start_price'], lot['price_decrement'], ticks
+
+
+def lot_message(lot, price):
+    return {'product_type': lot['fish_type'], 'quality': lot['quality'], 'price': price}
+
+
+def willing(lot, state, price):
+    """
+    Whether the merchant bids at `price`, as in Merchant.on_product_info.
+    """
+    return state['budget'] >= price and get_strategy(state['strategy']).decide(lot_message(lot, price), state)
+
+
+def has_feasible_buyer(lot, states):
+    """
+    The operator's demand index check (see Operator.is_feasible_buyer).
+    """
+    message = lot_message(lot, lot['bottom_price'])
+    return any(get_strategy(state['strategy']).decide(message, state) for state in states)
+
+
+def first_bid_tick(lot, state, message, grid):
+    """
+    Index of the first tick at which the merchant bids on the lot, or None.
+    `message` is the lot as announced at the start price and `grid` its
+    price_grid. Uses the strategy's price_limit when it has one and
+    otherwise a binary search on decide; both assume a merchant bidding at
+    some price also bids at any lower one.
+    """
+    start, decrement, ticks = grid
+    strategy = get_strategy(state['strategy'])
+    if strategy.price_limit is None:
+        low, high = 0, ticks
+        while low < high:
+            middle = (low + high) // 2
+            if willing(lot, state, start - middle * decrement):
+                high = middle
+            else:
+                low = middle + 1
+        return low if low < ticks else None
+    limit = strategy.price_limit(message, state)
+    if limit is None:
+        return None
+    if state['budget'] < limit:
+        limit = state['budget']
+    if limit >= start:
+        return 0
+    tick = math.ceil((start - limit) / decrement)
+    # Correct for rounding when the limit sits on a grid price
+    while tick < ticks and start - tick * decrement > limit:
+        tick += 1
+    while tick > 0 and start - (tick - 1) * decrement <= limit:
+        tick -= 1
+    return tick if tick < ticks else None
+
+
+def solve_lot(lot, states, demand_index=True):
+    """
+    Outcome of one lot without stepping the clock: the merchant bidding at the
+    highest grid price wins, ties going to the earlier merchant in `states`
+    (arrival order). Returns (winner index or None, price, ticks).
+    """
+    grid = start, decrement, ticks = price_grid(lot)
+    message = lot_message(lot, start)
+    best_tick, winner = ticks, None
+    for index, state in enumerate(states):
+        tick = first_bid_tick(lot, state, message, grid)
+        if tick is not None and tick < best_tick:
+            best_tick, winner = tick, index
+            if tick == 0:
+                break
+    if winner is None:
+        return None, 0, ticks if not demand_index or has_feasible_buyer(lot, states) else 0
+    return winner, start - best_tick * decrement, best_tick + 1
+
+
+def simulate_lot(lot, states, demand_index=True):
+    """
+    Reference outcome of one lot, stepping the clock tick by tick like the
+    operator and asking every merchant at each tick.
+    """
+    start, decrement, ticks = price_grid(lot)
+    if demand_index and not has_feasible_buyer(lot, states):
+        return None, 0, 0
+    for tick in range(ticks):
+        price = start - tick * decrement
+        for index, state in enumerate(states):
+            if willing(lot, state, price):
+                return index, price, tick + 1
+    return None, 0, ticks
+
+
+def run_session(lots, states, resolve_lot, total_lots, max_unsold=None, demand_index=True):
+    """
+    Auctions lots until `total_lots` are closed, `max_unsold` go unsold or,
+    with the demand index, no merchant can afford the bottom price. Updates
+    `states` in place and returns the transactions in the operator's format.
+    """
+    transactions = []
+    unsold = 0
+    lots = iter(lots)
+    while len(transactions) < total_lots and (max_unsold is None or unsold < max_unsold):
+        if demand_index and not any(state['budget'] >= BOTTOM_PRICE for state in states):
+            break
+        lot = next(lots, None)
+        if lot is None:
+            break
+        winner, price, ticks = resolve_lot(lot, states, demand_index)
+        if winner is None:
+            unsold += 1
+            transactions.append({'Product': len(transactions) + 1, 'SellPrice': 0, 'Merchant': 0, 'Ticks': ticks})
+            continue
+        state = states[winner]
+        state['budget'] -= price
+        state['inventory_counts'][lot['fish_type']] += 1
+        get_strategy(state['strategy']).on_purchase(state, lot['fish_type'], lot['quality'], price)
+        transactions.append({'Product': len(transactions) + 1, 'SellPrice': price, 'Merchant': state['name'], 'Ticks': ticks})
+    return transactions
+
+
+def solve_session(lots, states, total_lots, max_unsold=None, demand_index=True):
+    return run_session(lots, states, solve_lot, total_lots, max_unsold, demand_index)
+
+
+def simulate_session(lots, states, total_lots, max_unsold=None, demand_index=True):
+    return run_session(lots, states, simulate_lot, total_lots, max_unsold, demand_index)
+
+
+def check_session(lots, states, total_lots, max_unsold=None, demand_index=True):
+    """
+    Runs the fast path and the tick-by-tick reference on copies of the same
+    session. Returns the differing (fast, reference) transaction pairs, plus a
+    ('states', ...) entry if the final merchant states differ.
+    """
+    lots = list(lots)
+    fast_states, reference_states = copy.deepcopy(states), copy.deepcopy(states)
+    fast = solve_session(lots, fast_states, total_lots, max_unsold, demand_index)
+    reference = simulate_session(lots, reference_states, total_lots, max_unsold, demand_index)
+    mismatches = [pair for pair in itertools.zip_longest(fast, reference) if pair[0] != pair[1]]
+    if fast_states != reference_states:
+        mismatches.append(('states', fast_states, reference_states))
+    return mismatches
+
+
+def session_from_config(config):
+    """
+    Rebuilds a session the way toyAgentv2.py sets it up, as
+    (lots, merchant states, session options for run_session).
+    """
+    if config.get('price_clock', 'fixed') != 'fixed':
+        raise ValueError("The fast path only models the fixed price clock.")
+    operator_type = int(config.get('operator_type', 1))
+    seed = int(config['seed']) if config.get('seed') else None
+    use_quality = operator_type in (3, 4)
+    if operator_type in (2, 4):
+        options = {'total_lots': int(config.get('total_fish_to_sell', 10)), 'max_unsold': None}
+    else:
+        # OperatorInfinite: 30 fish in stock, stops after 3 unsold
+        options = {'total_lots': 30, 'max_unsold': 3}
+    options['demand_index'] = config.get('demand_index', 'on') == 'on'
+
+    supply = build_supply(
+        kind=config.get('lot_supply', 'round_robin'),
+        fish_types=FISH_TYPES,
+        qualities=FISH_QUALITIES if use_quality else None,
+        seed=seed,
+        lot_file=config.get('lot_file'),
+        type_mix=config.get('type_mix'),
+        quality_mix=config.get('quality_mix')
+    )
+    # Operators without quality do not pass it on to merchants
+    lots = [{**lot, 'quality': lot['quality'] if use_quality else None}
+            for lot in itertools.islice(supply, options['total_lots'])]
+
+    preference_rng = random.Random(seed)
+    states = []
+    for merchant_class, count_key, strategy_key in (
+            ('BasicMerchant', 'num_basic_merchants', 'basic_strategy'),
+            ('RichMerchant', 'num_rich_merchants', 'rich_strategy'),
+            ('PoorMerchant', 'num_poor_merchants', 'poor_strategy')):
+        for i in range(1, int(config.get(count_key, 0)) + 1):
+            states.append(merchant_state(
+                f'{merchant_class}_{i}', merchant_class, preference_rng.choice(FISH_TYPES),
+                strategy=config.get(strategy_key)
+            ))
+    return lots, states, options
+
+
+if __name__ == '__main__':
+    from toyAgentv2 import read_config_file
+    parser = argparse.ArgumentParser(description='Solve a session analytically and check it against the tick-by-tick clock.')
+    parser.add_argument('config', nargs='?', default='config.txt', help='configuration file')
+    parser.add_argument('--lots', type=int, help='override the number of lots (finite operators)')
+    args = parser.parse_args()
+
+    config = read_config_file(args.config)
+    if args.lots:
+        config['total_fish_to_sell'] = str(args.lots)
+    lots, states, options = session_from_config(config)
+
+    started = time.perf_counter()
+    fast = solve_session(lots, copy.deepcopy(states), **options)
+    fast_time = time.perf_counter() - started
+    started = time.perf_counter()
+    simulate_session(lots, copy.deepcopy(states), **options)
+    reference_time = time.perf_counter() - started
+
+    mismatches = check_session(lots, states, **options)
+    sold = sum(1 for transaction in fast if transaction['Merchant'] != 0)
+    print(f"Solved {len(fast)} lots ({sold} sold) for {len(states)} merchants: {len(mismatches)} mismatches.")
+    print(
+        f"Fast path {fast_time / max(1, len(fast)) * 1e6:.1f} us/lot, "
+        f"tick-by-tick {reference_time / max(1, len(fast)) * 1e6:.1f} us/lot."
+    )
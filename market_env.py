@@ -0,0 +1,176 @@
+import numpy as np
+from strategies import DEFAULT_THRESHOLD, THRESHOLD_DECAY
+from supply import FISH_TYPES, FISH_QUALITIES, START_PRICE, BOTTOM_PRICE, PRICE_DECREMENT
+
+# Opponent kinds, matching the merchant classes and their default strategies
+OPPONENT_KINDS = {'basic': 0, 'rich': 1, 'poor': 2}
+OPPONENT_BUDGETS = {'basic': 100, 'rich': 500, 'poor': 50}
+# preferred_price_threshold of RichMerchant and PoorMerchant
+OPPONENT_CAPS = {'basic': DEFAULT_THRESHOLD, 'rich': 30, 'poor': 15}
+# Kinds whose thresholds drop after buying preferred fish (see strategies.lower_threshold)
+LOWERS_THRESHOLDS = {'basic': True, 'rich': False, 'poor': True}
+
+INITIAL_THRESHOLDS = [30, 20, 10]  # good, normal, bad
+THRESHOLD_MINIMUMS = [10, 10, 10]
+
+OBSERVATION_NAMES = (
+    [f'type_{fish_type}' for fish_type in FISH_TYPES]
+    + [f'quality_{quality}' for quality in FISH_QUALITIES]
+    + ['price', 'budget']
+    + [f'inventory_{fish_type}' for fish_type in FISH_TYPES]
+)
+
+
+class MarketEnv:
+    """
+    K independent Dutch-auction markets stepped together, following the
+    clock of OperatorFiniteQuality. Each market has one learning merchant
+    and a fixed set of rule-based opponents. Every step is one clock tick.
+
+    Observations are float32 arrays of shape (K, len(OBSERVATION_NAMES)):
+    lot type and quality (one-hot), price and own budget (scaled to the
+    start price and starting budget) and own inventory counts. Actions are
+    1 (bid) or 0 (pass). The reward is the lot's value to the learner minus
+    the price paid, given only when the learner wins. Simultaneous bids go to
+    a random bidder, like arrival order on the bid socket. A market ends its
+    episode after `lots_per_episode` lots, sold or not, and resets itself.
+    """
+
+    def __init__(self, num_envs=1024, opponents=('basic', 'basic', 'basic', 'rich', 'poor', 'poor'),
+                 lots_per_episode=15, learner_budget=100, lot_values=(30, 20, 10),
+                 start_price=START_PRICE, bottom_price=BOTTOM_PRICE, price_decrement=PRICE_DECREMENT, seed=None):
+        self.num_envs = num_envs
+        self.lots_per_episode = lots_per_episode
+        self.learner_budget = learner_budget
+        self.lot_values = np.asarray(lot_values, dtype=np.float32)
+        self.start_price = start_price
+        self.bottom_price = bottom_price
+        self.price_decrement = price_decrement
+        self.rng = np.random.default_rng(seed)
+
+        self.opponent_kind = np.array([OPPONENT_KINDS[name] for name in opponents])
+        self.opponent_start_budget = np.array([OPPONENT_BUDGETS[name] for name in opponents], dtype=np.float32)
+        self.opponent_cap = np.array([OPPONENT_CAPS[name] for name in opponents], dtype=np.float32)
+        self.opponent_lowers = np.array([LOWERS_THRESHOLDS[name] for name in opponents])
+        self.threshold_minimums = np.asarray(THRESHOLD_MINIMUMS, dtype=np.float32)
+
+        k, m = num_envs, len(opponents)
+        self.env_index = np.arange(k)
+        self.lot_type = np.zeros(k, dtype=np.int64)
+        self.lot_quality = np.zeros(k, dtype=np.int64)
+        self.price = np.zeros(k, dtype=np.float32)
+        self.lots_done = np.zeros(k, dtype=np.int64)
+        self.budget = np.zeros(k, dtype=np.float32)
+        self.inventory = np.zeros((k, len(FISH_TYPES)), dtype=np.float32)
+        self.opponent_budget = np.zeros((k, m), dtype=np.float32)
+        self.opponent_preference = np.zeros((k, m), dtype=np.int64)
+        self.opponent_counts = np.zeros((k, m, len(FISH_TYPES)), dtype=np.int64)
+        self.opponent_thresholds = np.zeros((k, m, len(FISH_QUALITIES)), dtype=np.float32)
+
+    @property
+    def observation_size(self):
+        return len(OBSERVATION_NAMES)
+
+    def reset(self):
+        self.reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def reset_envs(self, mask):
+        """
+        Starts a new episode in the markets selected by `mask`.
+        """
+        count = int(mask.sum())
+        if not count:
+            return
+        m = len(self.opponent_kind)
+        self.lots_done[mask] = 0
+        self.budget[mask] = self.learner_budget
+        self.inventory[mask] = 0
+        self.opponent_budget[mask] = self.opponent_start_budget
+        self.opponent_preference[mask] = self.rng.integers(0, len(FISH_TYPES), (count, m))
+        self.opponent_counts[mask] = 0
+        self.opponent_thresholds[mask] = INITIAL_THRESHOLDS
+        self.next_lot(mask)
+
+    def next_lot(self, mask):
+        """
+        Puts a new lot on the clock: types in rotation, uniformly random quality.
+        """
+        self.lot_type[mask] = self.lots_done[mask] % len(FISH_TYPES)
+        self.lot_quality[mask] = self.rng.integers(0, len(FISH_QUALITIES), int(mask.sum()))
+        self.price[mask] = self.start_price
+
+    def observe(self):
+        observation = np.zeros((self.num_envs, self.observation_size), dtype=np.float32)
+        observation[self.env_index, self.lot_type] = 1
+        observation[self.env_index, len(FISH_TYPES) + self.lot_quality] = 1
+        offset = len(FISH_TYPES) + len(FISH_QUALITIES)
+        observation[:, offset] = self.price / self.start_price
+        observation[:, offset + 1] = self.budget / self.learner_budget
+        observation[:, offset + 2:] = self.inventory
+        return observation
+
+    def opponent_bids(self):
+        """
+        Evaluates every opponent's strategy at the current price, for all markets at once.
+        """
+        price = self.price[:, None]
+        preferred = self.opponent_preference == self.lot_type[:, None]
+        quality = self.lot_quality[:, None, None]
+        threshold = np.take_along_axis(self.opponent_thresholds, quality, axis=2)[:, :, 0]
+        lot_type = self.lot_type[:, None, None]
+        first_of_type = np.take_along_axis(self.opponent_counts, lot_type, axis=2)[:, :, 0] == 0
+
+        basic = np.where(preferred, price <= threshold, first_of_type & (price <= threshold / 2))
+        rich = np.where(preferred, price <= self.opponent_cap, basic)
+        poor = price <= self.opponent_cap
+        bids = np.choose(self.opponent_kind, [basic, rich, poor])
+        return bids & (self.opponent_budget >= price)
+
+    def step(self, actions):
+        """
+        Advances every market by one clock tick.
+        Returns (observations, rewards, dones, info).
+        """
+        actions = np.asarray(actions).astype(bool)
+        learner_bids = actions & (self.budget >= self.price)
+        bids = np.concatenate([learner_bids[:, None], self.opponent_bids()], axis=1)
+
+        # Random tie-breaking among simultaneous bidders
+        order = self.rng.random(bids.shape)
+        order[~bids] = -1
+        winner = order.argmax(axis=1)
+        sold = bids.any(axis=1)
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        learner_won = sold & (winner == 0)
+        if learner_won.any():
+            rewards[learner_won] = self.lot_values[self.lot_quality[learner_won]] - self.price[learner_won]
+            self.budget[learner_won] -= self.price[learner_won]
+            self.inventory[learner_won, self.lot_type[learner_won]] += 1
+
+        opponent_won = sold & (winner > 0)
+        if opponent_won.any():
+            envs = self.env_index[opponent_won]
+            opponents = winner[opponent_won] - 1
+            fish_type = self.lot_type[opponent_won]
+            quality = self.lot_quality[opponent_won]
+            self.opponent_budget[envs, opponents] -= self.price[opponent_won]
+            self.opponent_counts[envs, opponents, fish_type] += 1
+            lowers = self.opponent_lowers[opponents] & (self.opponent_preference[envs, opponents] == fish_type)
+            envs, opponents, quality = envs[lowers], opponents[lowers], quality[lowers]
+            self.opponent_thresholds[envs, opponents, quality] = np.maximum(
+                self.opponent_thresholds[envs, opponents, quality] * THRESHOLD_DECAY,
+                self.threshold_minimums[quality]
+            )
+
+        info = {'sold': sold, 'winner': np.where(sold, winner, -1), 'price': self.price.copy()}
+
+        # Unsold lots tick down; lots falling below the bottom price go unsold
+        self.price[~sold] -= self.price_decrement
+        closed = sold | (self.price < self.bottom_price)
+        self.lots_done[closed] += 1
+        dones = self.lots_done >= self.lots_per_episode
+        self.next_lot(closed & ~dones)
+        self.reset_envs(dones)
+        return self.observe(), rewards, dones, info
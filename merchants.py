@@ -1,12 +1,16 @@
 import random
 from osbrain import Agent
+from eventlog import EventLogging
+from profiler import Profiling, profiled
+from strategies import get_strategy
 
-class Merchant(Agent):
+class Merchant(Profiling, EventLogging, Agent):
     def on_init(self):
+        self.setup_event_log()
         self.inventory = {}
         self.budget = 100  # Default budget, adjustable by subclasses
         self.preference = random.choice(['H', 'S', 'T'])  # Random fish type preference
-        self.log_info(f"My preference is: {self.preference}")
+        self.log_event('preference', "My preference is: {}", self.preference)
         self.fish_types = ['H', 'S', 'T']
         self.current_auctions = {}
 
@@ -17,6 +21,9 @@ class Merchant(Agent):
         self.preferred_price_thresholds = {'good': 30, 'normal': 20, 'bad': 10}
         self.preferred_price_minimums = {'good': 10, 'normal': 10, 'bad': 10}
 
+        # Bidding strategy name (see strategies.py), adjustable by subclasses or set_attr
+        self.strategy = 'basic'
+
     def get_name(self):
         """
         Return the name of the merchant for external access.
@@ -30,7 +37,10 @@ class Merchant(Agent):
             self.on_product_info(message)
         elif message_type == 'confirmation':
             self.on_confirmation(message)
+        elif message_type == 'rejection':
+            self.on_rejection(message)
 
+    @profiled
     def on_product_info(self, message):
         """
         Handles product auction information and decides whether to bid.
@@ -53,22 +63,10 @@ class Merchant(Agent):
             'status': 'open'
         }
 
-        # Determine the threshold for quality (default to mid-range if not specified)
-        threshold = self.preferred_price_thresholds.get(quality, 20)
-
-        # Buying logic
-        should_buy = False
-        if product_type == self.preference:
-            # Buy preferred fish within acceptable price range
-            if price <= threshold:
-                should_buy = True
-        else:
-            # Buy non-preferred fish if discounted and inventory is empty
-            if self.inventory_counts[product_type] == 0 and price <= (threshold / 2):
-                should_buy = True
+        should_buy = get_strategy(self.strategy).decide(message, self.strategy_state())
 
         if should_buy:
-            self.log_info(f"Attempting to buy Fish {product_number} at price {price} with quality {quality}")
+            self.log_event('bid', "Attempting to buy Fish {} at price {} with quality {}", product_number, price, quality)
             bid = {
                 'merchant_id': self.name,
                 'product_number': product_number,
@@ -78,20 +76,55 @@ class Merchant(Agent):
             # Mark auction as pending
             self.current_auctions[product_number]['status'] = 'pending'
 
+    def strategy_state(self):
+        """
+        Returns the state the bidding strategy decides on.
+        """
+        return {
+            'budget': self.budget,
+            'preference': self.preference,
+            'inventory_counts': self.inventory_counts,
+            'preferred_price_thresholds': self.preferred_price_thresholds,
+            'preferred_price_minimums': self.preferred_price_minimums,
+            'preferred_price_threshold': getattr(self, 'preferred_price_threshold', None)
+        }
+
+    @profiled
+    def on_rejection(self, message):
+        """
+        Handles the batched notice sent to merchants that lost a lot in arbitration.
+        """
+        if self.name not in message.get('merchant_ids', []):
+            return
+        product_number = message.get('product_number')
+        self.log_event('rejected', "Bid for Fish {} was rejected", product_number)
+        self.close_lost_auction(product_number)
+
+    def close_lost_auction(self, product_number):
+        """
+        Marks an auction this merchant did not win as closed.
+        """
+        auction = self.current_auctions.get(product_number)
+        if auction is not None:
+            auction['status'] = 'closed'
+
+    @profiled
     def on_confirmation(self, message):
         """
         Handles confirmation of purchase and updates inventory, budget, and price thresholds.
         """
         merchant_id = message.get('merchant_id')
         if merchant_id != self.name:
-            return  # Ignore confirmations not meant for this merchant
+            # Sold to someone else, so any bid we still have out lost
+            self.close_lost_auction(message.get('product_number'))
+            return
 
         product_number = message.get('product_number')
         price = message.get('price')
         product_type = message.get('product_type')
         quality = message.get('quality', None)
 
-        self.log_info(f"Purchase confirmed for Fish {product_number} at price {price} with quality {quality}")
+        self.log_event('purchase', "Purchase confirmed for Fish {} at price {} with quality {}", product_number, price, quality)
         self.budget -= price
 
         # Update inventory
@@ -101,21 +134,41 @@ class Merchant(Agent):
             'price': price
         }
         self.inventory_counts[product_type] += 1
-        self.log_info(f"Remaining budget: {self.budget}")
+        self.log_event('budget', "Remaining budget: {}", self.budget)
 
         # Mark auction as closed
         self.current_auctions[product_number]['status'] = 'closed'
 
-        # Adjust thresholds if preferred fish is bought
-        if product_type == self.preference and quality in self.preferred_price_thresholds:
-            old_threshold = self.preferred_price_thresholds[quality]
-            self.preferred_price_thresholds[quality] *= 0.8  # Reduce threshold by 20%
-            if self.preferred_price_thresholds[quality] < self.preferred_price_minimums[quality]:
-                self.preferred_price_thresholds[quality] = self.preferred_price_minimums[quality]
-            self.log_info(
-                f"Threshold for {quality} quality reduced from {old_threshold:.2f} to {self.preferred_price_thresholds[quality]:.2f}"
+        # Let the strategy adapt its thresholds
+        old_threshold = self.preferred_price_thresholds.get(quality)
+        get_strategy(self.strategy).on_purchase(self.strategy_state(), product_type, quality, price)
+        if self.preferred_price_thresholds.get(quality) != old_threshold:
+            self.log_event(
+                'threshold', "Threshold for {} quality reduced from {:.2f} to {:.2f}",
+                quality, old_threshold, self.preferred_price_thresholds[quality]
             )
 
+    def checkpoint_state(self):
+        """
+        Returns the merchant state saved in session checkpoints.
+        """
+        return {
+            'budget': self.budget,
+            'preference': self.preference,
+            'strategy': self.strategy,
+            'inventory': self.inventory,
+            'inventory_counts': self.inventory_counts,
+            'preferred_price_thresholds': self.preferred_price_thresholds
+        }
+
+    def restore_state(self, state):
+        """
+        Restores the state saved by checkpoint_state.
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.log_event('restore', "Restored with budget {} and {} fish", self.budget, len(self.inventory))
+
     def on_exit(self):
         """Optional cleanup logic."""
         self.log_info("Merchant shutting down.")
@@ -135,31 +188,7 @@ class RichMerchant(Merchant):
         # Rich merchants always accept the max price for preferred fish
         self.preferred_price_threshold = 30
         self.preferred_price_minimum = 30  # No decrease
-
-    def on_confirmation(self, message):
-        """
-        Handles confirmation of purchase and updates inventory, budget, and price thresholds.
-        """
-        merchant_id = message.get('merchant_id')
-        if merchant_id != self.name:
-            return  # Ignore confirmations not meant for this merchant
-
-        product_number = message.get('product_number')
-        price = message.get('price')
-        product_type = message.get('product_type')
-        quality = message.get('quality', 'N/A')  # Ensure quality is logged correctly
-
-        self.log_info(f"Purchase confirmed for Fish {product_number} at price {price} with quality {quality}")
-        self.budget -= price
-
-        # Update inventory with quality
-        self.inventory[product_number] = {
-            'type': product_type,
-            'quality': quality,
-            'price': price
-        }
-        self.inventory_counts[product_type] += 1
-        self.log_info(f"Remaining budget: {self.budget}")
+        self.strategy = 'rich'
 
 
 class PoorMerchant(Merchant):
@@ -169,30 +198,5 @@ class PoorMerchant(Merchant):
         # Set a low preferred price threshold
         self.preferred_price_threshold = 15
         self.preferred_price_minimum = 10
-
-    def on_product_info(self, message):
-        # Override buying logic to only buy at heavy discounts
-        product_number = message.get('product_number')
-        product_type = message.get('product_type')
-        price = message.get('price')
-
-        if self.budget >= price and self.current_auctions.get(product_number, {}).get('status') != 'closed':
-            self.current_auctions[product_number] = {
-                'product_type': product_type,
-                'price': price,
-                'status': 'open'
-            }
-            should_buy = False
-
-            if price <= 15:
-                # Only buy if price is heavily discounted
-                should_buy = True
-
-            if should_buy:
-                self.log_info(f"Attempting to buy Fish {product_number} at price {price}")
-                bid = {
-                    'merchant_id': self.name,
-                    'product_number': product_number,
-                }
-                self.send('bid_channel', bid)
-                self.current_auctions[product_number]['status'] = 'pending'
\ No newline at end of file
+        # Only buy at heavy discounts
+        self.strategy = 'poor'
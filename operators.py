@@ -1,8 +1,21 @@
-import random
+import itertools
 from osbrain import Agent
+from eventlog import EventLogging
+from pricing import build_clock
+from profiler import Profiling, profiled
+from strategies import get_strategy
+from supply import FISH_QUALITIES, BOTTOM_PRICE, build_supply
+
+class Operator(Profiling, EventLogging, Agent):
+    # Seconds between price ticks
+    tick_interval = 1
+    # Seconds to keep collecting bids for a tick after the first one arrives
+    bid_window = 0.05
+    # Qualities assigned to lots; None for operators that ignore quality
+    fish_qualities = None
 
-class Operator(Agent):
     def on_init(self):
+        self.setup_event_log()
         # PUB socket to broadcast auction info and confirmations
         self.publish_address = self.bind('PUB', alias='publish_channel')
         # PULL socket to receive bids from merchants
@@ -13,65 +26,281 @@ class Operator(Agent):
         self.current_auction = None
         self.running = True  # Indicates whether the auction is running
 
+        # Bid arbitration state for the lot currently on the clock
+        self.open_product = None  # Product number accepting bids, None when closed
+        self.pending_bids = []  # Merchant ids in arrival order for the current tick
+        self.bid_count = 0
+        self.stale_bid_count = 0
+        self.duplicate_bid_count = 0
+
+        # Lots are pulled from the supply on demand; options come from the
+        # 'supply_options' attribute (see supply.build_supply)
+        supply_options = getattr(self, 'supply_options', {})
+        self.supply = iter(build_supply(
+            fish_types=self.fish_types, qualities=self.fish_qualities, **supply_options
+        ))
+        # Price clock driving each lot's descent; options come from the
+        # 'clock_options' attribute (see pricing.build_clock)
+        self.clock = build_clock(**getattr(self, 'clock_options', {}))
+
+        # Live demand: mirrored merchant states and, per (fish type, quality,
+        # bottom price), the merchants that would buy such a lot at some price.
+        # Disabled (every lot is auctioned) until register_merchants is called.
+        self.merchant_states = None
+        self.demand_index = {}
+        self.skipped_lot_count = 0
 
     def start_auction(self):
+        # Resume a checkpointed session if the runner passed one
+        resume_state = getattr(self, 'resume_state', None)
+        if resume_state:
+            self.restore_state(resume_state)
         self.auction_next_fish()
 
+    def checkpoint_state(self, transactions_since=0):
+        """
+        Returns the operator state as of the last closed lot, with only the
+        transactions recorded after `transactions_since`. A lot still on the
+        clock is left out, so a resumed session auctions it again.
+        """
+        lot_open = self.running and self.current_auction is not None and not self.current_auction['sold']
+        return {
+            'fish_index': self.fish_index - lot_open,
+            'lot_open': lot_open,
+            'transactions': self.transactions[transactions_since:],
+            'clock': self.clock
+        }
+
+    def restore_state(self, state):
+        """
+        Restores a checkpointed state so the session continues at the next lot.
+        """
+        self.fish_index = state['fish_index']
+        self.transactions = list(state['transactions'])
+        self.clock = state['clock']
+        # Skip the lots that were already auctioned
+        self.supply = itertools.islice(self.supply, self.fish_index, None)
+        self.log_event('resume', "Resuming session after Fish {}.", self.fish_index)
+
+    def register_merchants(self, profiles):
+        """
+        Enables the demand index. `profiles` maps merchant names to their
+        strategy state (see Merchant.strategy_state) plus a 'strategy' name.
+        """
+        self.merchant_states = profiles
+        self.demand_index = {}
+        self.log_event('demand', "Tracking demand for {} merchants.", len(profiles))
+
+    def is_feasible_buyer(self, state, key):
+        """
+        Whether a merchant would buy a lot at its bottom price. Strategies pay
+        at most a limit, so a merchant not buying at the bottom price would not
+        buy at any price on the clock.
+        """
+        fish_type, quality, bottom_price = key
+        lot = {'product_type': fish_type, 'quality': quality, 'price': bottom_price}
+        return get_strategy(state['strategy']).decide(lot, state)
+
+    def has_demand(self, auction):
+        """
+        Whether any merchant could buy the lot; always True without registered merchants.
+        """
+        if self.merchant_states is None:
+            return True
+        key = (auction['fish_type'], auction.get('quality'), auction['bottom_price'])
+        if key not in self.demand_index:
+            self.demand_index[key] = {
+                name for name, state in self.merchant_states.items() if self.is_feasible_buyer(state, key)
+            }
+        return bool(self.demand_index[key])
+
+    def demand_remaining(self):
+        """
+        False once no merchant can afford a lot at the standard bottom price.
+        """
+        if self.merchant_states is None:
+            return True
+        return any(state['budget'] >= BOTTOM_PRICE for state in self.merchant_states.values())
+
+    def update_demand(self, merchant_id, auction):
+        """
+        Mirrors a confirmed purchase in the merchant's state, the same way the
+        merchant does, and refreshes only that merchant's index entries.
+        """
+        state = self.merchant_states.get(merchant_id)
+        if state is None:
+            return
+        price = auction['current_price']
+        state['budget'] -= price
+        state['inventory_counts'][auction['fish_type']] += 1
+        get_strategy(state['strategy']).on_purchase(state, auction['fish_type'], auction.get('quality'), price)
+        for key, buyers in self.demand_index.items():
+            if self.is_feasible_buyer(state, key):
+                buyers.add(merchant_id)
+            else:
+                buyers.discard(merchant_id)
+
     def auction_next_fish(self):
         # To be implemented in subclasses
         pass
 
+    def next_auction(self):
+        """
+        Pulls the next lot from the supply and opens an auction for it.
+        Returns None when the supply is exhausted.
+        """
+        lot = next(self.supply, None)
+        if lot is None:
+            return None
+        self.fish_index += 1
+        auction = {
+            'fish_type': lot['fish_type'],
+            'product_number': self.fish_index,
+            'start_price': lot['start_price'],
+            'current_price': lot['start_price'],
+            'bottom_price': lot['bottom_price'],
+            'price_decrement': lot['price_decrement'],
+            'ticks': 0,
+            'sold': False
+        }
+        if self.fish_qualities:
+            auction['quality'] = lot['quality']
+        auction['current_price'] = self.clock.start_price(auction)
+        return auction
+
     def send_fish_info(self):
         auction = self.current_auction
         if not auction['sold']:
-            self.log_info(
-                f"Auctioning Fish {auction['product_number']}: Type {auction['fish_type']}, Price {auction['current_price']}."
-            )
+            auction['ticks'] += 1
             product_info = {
                 'message_type': 'auction_info',
                 "product_number": auction['product_number'],
                 "product_type": auction['fish_type'],
                 "price": auction['current_price']
             }
+            if 'quality' in auction:
+                product_info['quality'] = auction['quality']
+                self.log_event(
+                    'tick', "Auctioning Fish {}: Type {}, Quality {}, Price {}.",
+                    auction['product_number'], auction['fish_type'], auction['quality'], auction['current_price']
+                )
+            else:
+                self.log_event(
+                    'tick', "Auctioning Fish {}: Type {}, Price {}.",
+                    auction['product_number'], auction['fish_type'], auction['current_price']
+                )
+            self.open_product = auction['product_number']
             self.send('publish_channel', product_info)
-            self.timer = self.after(1, self.check_for_replies, alias='price_decrement_timer')
+            self.timer = self.after(self.tick_interval, self.check_for_replies, alias='price_decrement_timer')
 
+    @profiled
     def on_bid(self, bid):
-        self.log_info(f"Received bid: {bid}")
+        """
+        Collects bids for the current tick. The first bid opens a short
+        arbitration window; stale and duplicate bids are dropped cheaply.
+        """
+        self.bid_count += 1
+        if bid.get('product_number') != self.open_product:
+            self.stale_bid_count += 1
+            return
         merchant_id = bid.get('merchant_id')
+        if merchant_id in self.pending_bids:
+            self.duplicate_bid_count += 1
+            return
+        self.pending_bids.append(merchant_id)
+        if len(self.pending_bids) == 1:
+            # Freeze the clock at this price while the window is open
+            self.stop_timer('price_decrement_timer')
+            self.after(self.bid_window, self.resolve_bids, alias='bid_window_timer')
+
+    @profiled
+    def resolve_bids(self, *args, **kwargs):
+        """
+        Closes the arbitration window: the first bid to arrive wins the lot
+        and every other bidder gets a single batched rejection notice.
+        """
         auction = self.current_auction
-        if auction and not auction['sold']:
-            if bid.get('product_number') == auction['product_number']:
-                # Sell the fish
-                self.log_info(f"Fish {auction['product_number']} sold to Merchant {merchant_id} at price {auction['current_price']}.")
-                auction['sold'] = True
-                self.transactions.append({
-                    'Product': auction['product_number'],
-                    'SellPrice': auction['current_price'],
-                    'Merchant': merchant_id
-                })
-                # Stop the timer
-                self.stop_timer('price_decrement_timer')
-                # Send confirmation
-                confirmation = {
-                    'message_type': 'confirmation',
-                    'status': 'confirmed',
-                    'product_number': auction['product_number'],
-                    'merchant_id': merchant_id,
-                    'price': auction['current_price'],
-                    'product_type': auction['fish_type']
-                }
-                self.send('publish_channel', confirmation)
-                # Move to the next auction
-                self.auction_next_fish()
-        # If fish already sold or bid is invalid, ignore
+        winner, losers = self.pending_bids[0], self.pending_bids[1:]
+        self.pending_bids = []
+        self.open_product = None
+        self.log_event('sold', "Fish {} sold to Merchant {} at price {}.", auction['product_number'], winner, auction['current_price'])
+        self.sell_current_fish(winner)
+        if losers:
+            self.log_event('rejected', "Rejected {} late bids for Fish {}.", len(losers), auction['product_number'])
+            rejection = {
+                'message_type': 'rejection',
+                'product_number': auction['product_number'],
+                'merchant_ids': losers
+            }
+            self.send('publish_channel', rejection)
+        # Move to the next auction
+        self.auction_next_fish()
 
-    def check_for_replies(self, *args, **kwargs):
-        # To be implemented in subclasses
-        pass
+    def sell_current_fish(self, merchant_id):
+        """
+        Records the sale of the current fish and publishes the confirmation.
+        """
+        auction = self.current_auction
+        auction['sold'] = True
+        self.clock.record_sale(auction)
+        self.transactions.append({
+            'Product': auction['product_number'],
+            'SellPrice': auction['current_price'],
+            'Merchant': merchant_id,
+            'Ticks': auction['ticks']
+        })
+        confirmation = {
+            'message_type': 'confirmation',
+            'status': 'confirmed',
+            'product_number': auction['product_number'],
+            'merchant_id': merchant_id,
+            'price': auction['current_price'],
+            'product_type': auction['fish_type'],
+            'quality': auction.get('quality')  # None for operators without quality
+        }
+        self.send('publish_channel', confirmation)
+        if self.merchant_states is not None:
+            self.update_demand(merchant_id, auction)
+
+    def record_unsold_fish(self):
+        """
+        Records the current fish as unsold.
+        """
+        auction = self.current_auction
+        self.open_product = None
+        self.transactions.append({
+            'Product': auction['product_number'],
+            'SellPrice': 0,
+            'Merchant': 0,  # Indicate unsold
+            'Ticks': auction['ticks']
+        })
+
+    def open_next_fish(self, auction):
+        """
+        Puts a lot on the clock. A lot nobody can buy closes at once as unsold;
+        returns False in that case so the caller moves on to the next lot.
+        """
+        self.current_auction = auction
+        if self.has_demand(auction):
+            self.send_fish_info()
+            return True
+        self.log_event('skipped', "Fish {} has no feasible buyer.", auction['product_number'])
+        self.skipped_lot_count += 1
+        self.record_unsold_fish()
+        return False
 
-    def on_stop(self):
-        log_transactions(self.transactions)
+    @profiled
+    def check_for_replies(self, *args, **kwargs):
+        auction = self.current_auction
+        # The clock is frozen while an arbitration window is open
+        if not auction['sold'] and not self.pending_bids:
+            auction['current_price'] = self.clock.next_price(auction)
+            if auction['current_price'] >= auction['bottom_price']:
+                self.send_fish_info()
+            else:
+                self.log_event('unsold', "Fish {} was not sold.", auction['product_number'])
+                self.record_unsold_fish()
+                self.auction_next_fish()
 
 
 class OperatorInfinite(Operator):
@@ -81,39 +310,31 @@ class OperatorInfinite(Operator):
         self.unsold_count = 0
         self.max_unsold = 3
 
+    def checkpoint_state(self, transactions_since=0):
+        state = super().checkpoint_state(transactions_since)
+        state['fish_in_stock'] = self.fish_in_stock + state['lot_open']
+        state['unsold_count'] = self.unsold_count
+        return state
+
+    def restore_state(self, state):
+        super().restore_state(state)
+        self.fish_in_stock = state['fish_in_stock']
+        self.unsold_count = state['unsold_count']
+
     def auction_next_fish(self):
-        if self.fish_in_stock > 0 and self.unsold_count < self.max_unsold:
-            fish_type = self.fish_types[self.fish_index % len(self.fish_types)]
-            self.fish_index += 1
+        while self.fish_in_stock > 0 and self.unsold_count < self.max_unsold and self.demand_remaining():
+            auction = self.next_auction()
+            if auction is None:
+                break
             self.fish_in_stock -= 1
-            self.current_auction = {
-                'fish_type': fish_type,
-                'product_number': self.fish_index,
-                'current_price': 30,
-                'bottom_price': 10,
-                'price_decrement': 2,
-                'sold': False
-            }
-            self.send_fish_info()
-        else:
-            self.log_info("Auction ended.")
-            self.running = False  # Set running to False when auction ends
+            if self.open_next_fish(auction):
+                return
+        self.log_event('ended', "Auction ended.")
+        self.running = False  # Set running to False when auction ends
 
-    def check_for_replies(self, *args, **kwargs):
-        auction = self.current_auction
-        if not auction['sold']:
-            auction['current_price'] -= auction['price_decrement']
-            if auction['current_price'] >= auction['bottom_price']:
-                self.send_fish_info()
-            else:
-                self.log_info(f"Fish {auction['product_number']} was not sold.")
-                self.unsold_count += 1
-                self.transactions.append({
-                    'Product': auction['product_number'],
-                    'SellPrice': 0,
-                    'Merchant': 0  # Indicate unsold
-                })
-                self.auction_next_fish()
+    def record_unsold_fish(self):
+        super().record_unsold_fish()
+        self.unsold_count += 1
 
 
 class OperatorFinite(Operator):
@@ -122,159 +343,44 @@ class OperatorFinite(Operator):
         self.total_fish_to_sell = self.get_attr('total_fish_to_sell')
         self.fish_sold_count = 0
 
+    def checkpoint_state(self, transactions_since=0):
+        state = super().checkpoint_state(transactions_since)
+        state['fish_sold_count'] = self.fish_sold_count
+        return state
+
+    def restore_state(self, state):
+        super().restore_state(state)
+        self.fish_sold_count = state['fish_sold_count']
+
     def auction_next_fish(self):
-        if self.fish_sold_count < self.total_fish_to_sell:
-            fish_type = self.fish_types[self.fish_index % len(self.fish_types)]
-            self.fish_index += 1
-            self.current_auction = {
-                'fish_type': fish_type,
-                'product_number': self.fish_index,
-                'current_price': 30,
-                'bottom_price': 10,
-                'price_decrement': 2,
-                'sold': False
-            }
-            self.send_fish_info()
+        while self.fish_sold_count < self.total_fish_to_sell:
+            if not self.demand_remaining():
+                self.log_event('ended', "Auction ended early: no merchant can afford another fish.")
+                break
+            auction = self.next_auction()
+            if auction is None:
+                self.log_event('ended', "Auction ended: the lot supply is exhausted.")
+                break
+            if self.open_next_fish(auction):
+                return
         else:
-            self.log_info("Auction ended after selling the specified number of fish.")
-            self.running = False  # Set running to False when auction ends
+            self.log_event('ended', "Auction ended after selling the specified number of fish.")
+        self.running = False  # Set running to False when auction ends
 
-    def check_for_replies(self, *args, **kwargs):
-        auction = self.current_auction
-        if not auction['sold']:
-            auction['current_price'] -= auction['price_decrement']
-            if auction['current_price'] >= auction['bottom_price']:
-                self.send_fish_info()
-            else:
-                self.log_info(f"Fish {auction['product_number']} was not sold.")
-                self.transactions.append({
-                    'Product': auction['product_number'],
-                    'SellPrice': 0,
-                    'Merchant': 0  # Indicate unsold
-                })
-                self.fish_sold_count += 1  # Increment the sold count for unsold fish
-                self.auction_next_fish()
+    def record_unsold_fish(self):
+        super().record_unsold_fish()
+        self.fish_sold_count += 1  # Increment the sold count for unsold fish
 
-
-    def on_bid(self, bid):
-        self.log_info(f"Received bid: {bid}")
-        merchant_id = bid.get('merchant_id')
-        auction = self.current_auction
-        if auction and not auction['sold']:
-            if bid.get('product_number') == auction['product_number']:
-                # Sell the fish
-                self.log_info(
-                    f"Fish {auction['product_number']} sold to Merchant {merchant_id} at price {auction['current_price']}."
-                )
-                auction['sold'] = True
-                self.transactions.append({
-                    'Product': auction['product_number'],
-                    'SellPrice': auction['current_price'],
-                    'Merchant': merchant_id
-                })
-                # Increment fish_sold_count for sold fish
-                self.fish_sold_count += 1
-
-                # Stop the timer
-                self.stop_timer('price_decrement_timer')
-
-                # Send confirmation with quality
-                confirmation = {
-                    'message_type': 'confirmation',
-                    'status': 'confirmed',
-                    'product_number': auction['product_number'],
-                    'merchant_id': merchant_id,
-                    'price': auction['current_price'],
-                    'product_type': auction['fish_type'],
-                    'quality': auction.get('quality')  # Include quality in confirmation
-                }
-                self.send('publish_channel', confirmation)
-
-                # Move to the next auction
-                self.auction_next_fish()
+    def sell_current_fish(self, merchant_id):
+        super().sell_current_fish(merchant_id)
+        # Increment fish_sold_count for sold fish
+        self.fish_sold_count += 1
 
 
 class OperatorInfiniteQuality(OperatorInfinite):
-    def auction_next_fish(self):
-        if self.fish_in_stock > 0 and self.unsold_count < self.max_unsold:
-            fish_type = self.fish_types[self.fish_index % len(self.fish_types)]
-            fish_quality = random.choice(['good', 'normal', 'bad'])
-            self.fish_index += 1
-            self.fish_in_stock -= 1
-            self.current_auction = {
-                'fish_type': fish_type,
-                'quality': fish_quality,
-                'product_number': self.fish_index,
-                'current_price': 30,
-                'bottom_price': 10,
-                'price_decrement': 2,
-                'sold': False
-            }
-            self.send_fish_info()
-        else:
-            self.log_info("Auction ended.")
-            self.running = False  # Set running to False when auction ends
-
-    def send_fish_info(self):
-        auction = self.current_auction
-        if not auction['sold']:
-            self.log_info(
-                f"Auctioning Fish {auction['product_number']}: Type {auction['fish_type']}, "
-                f"Quality {auction['quality']}, Price {auction['current_price']}."
-            )
-            product_info = {
-                'message_type': 'auction_info',
-                'product_number': auction['product_number'],
-                'product_type': auction['fish_type'],
-                'quality': auction['quality'],
-                'price': auction['current_price']
-            }
-            self.send('publish_channel', product_info)
-            self.timer = self.after(1, self.check_for_replies, alias='price_decrement_timer')
+    fish_qualities = FISH_QUALITIES
 
 
 # New OperatorFiniteQuality subclass with quality
 class OperatorFiniteQuality(OperatorFinite):
-    def auction_next_fish(self):
-        if self.fish_sold_count < self.total_fish_to_sell:
-            fish_type = self.fish_types[self.fish_index % len(self.fish_types)]
-            fish_quality = random.choice(['good', 'normal', 'bad'])
-            self.fish_index += 1
-            self.current_auction = {
-                'fish_type': fish_type,
-                'quality': fish_quality,
-                'product_number': self.fish_index,
-                'current_price': 30,
-                'bottom_price': 10,
-                'price_decrement': 2,
-                'sold': False
-            }
-            self.send_fish_info()
-        else:
-            self.log_info("Auction ended after selling the specified number of fish.")
-            self.running = False  # Set running to False when auction ends
-
-    def send_fish_info(self):
-        auction = self.current_auction
-        if not auction['sold']:
-            self.log_info(
-                f"Auctioning Fish {auction['product_number']}: Type {auction['fish_type']}, "
-                f"Quality {auction['quality']}, Price {auction['current_price']}."
-            )
-            product_info = {
-                'message_type': 'auction_info',
-                'product_number': auction['product_number'],
-                'product_type': auction['fish_type'],
-                'quality': auction['quality'],
-                'price': auction['current_price']
-            }
-            self.send('publish_channel', product_info)
-            self.timer = self.after(1, self.check_for_replies, alias='price_decrement_timer')
-
-
-
-
-
-
-
-
+    fish_qualities = FISH_QUALITIES
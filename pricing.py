@@ -0,0 +1,109 @@
+from collections import deque
+
+
+class FixedClock:
+    """
+    The original Dutch clock: every lot opens at its start price and drops
+    by its price decrement each tick until it reaches the bottom price.
+    """
+
+    def start_price(self, auction):
+        return auction['start_price']
+
+    def next_price(self, auction):
+        return auction['current_price'] - auction['price_decrement']
+
+    def record_sale(self, auction):
+        pass
+
+
+class AdaptiveClock(FixedClock):
+    """
+    Learns recent clearing prices per (fish type, quality) and uses them to
+    skip ticks that rarely sell.
+
+    - A lot opens `margin` above the highest recent clearing price, never
+      above the lot's own start price.
+    - Above the fine band (highest recent clearing + `fine_band`) the price
+      drops by `coarse_step`. Inside the band it drops by the lot's decrement.
+    - Every price stays on the lot's own grid (start - k * decrement). The
+      bottom price is always offered before a lot goes unsold.
+    A lot that sells at its opening price raises the next opening by
+    `margin`, so the clock recovers when demand goes up.
+    """
+
+    def __init__(self, history=10, margin=2, fine_band=4, coarse_step=6, min_history=3):
+        self.history = history
+        self.margin = margin
+        self.fine_band = fine_band
+        self.coarse_step = coarse_step
+        self.min_history = min_history
+        self.clearing_prices = {}  # (fish_type, quality) -> recent clearing prices
+
+    def recent_high(self, auction):
+        prices = self.clearing_prices.get((auction['fish_type'], auction.get('quality')))
+        if not prices or len(prices) < self.min_history:
+            return None
+        return max(prices)
+
+    @staticmethod
+    def snap_up(auction, price):
+        """
+        Rounds a price up to the lot's grid, within [bottom, start].
+        """
+        start, step = auction['start_price'], auction['price_decrement']
+        steps_down = max(0, (start - price) // step)
+        return max(auction['bottom_price'], start - steps_down * step)
+
+    def start_price(self, auction):
+        recent_high = self.recent_high(auction)
+        if recent_high is None:
+            return auction['start_price']
+        return self.snap_up(auction, recent_high + self.margin)
+
+    def next_price(self, auction):
+        price = auction['current_price']
+        fine_price = price - auction['price_decrement']
+        recent_high = self.recent_high(auction)
+        if recent_high is None:
+            return fine_price
+        band_top = self.snap_up(auction, recent_high + self.fine_band)
+        if price <= band_top:
+            return fine_price
+        # Coarse step, but never jump past the top of the fine band, so no
+        # merchant who would buy inside the band is skipped over
+        return max(self.snap_up(auction, price - self.coarse_step), band_top)
+
+    def record_sale(self, auction):
+        key = (auction['fish_type'], auction.get('quality'))
+        if key not in self.clearing_prices:
+            self.clearing_prices[key] = deque(maxlen=self.history)
+        self.clearing_prices[key].append(auction['current_price'])
+
+
+def build_clock(kind='fixed', **options):
+    """
+    Builds a price clock from the options used in config.txt.
+    """
+    if kind == 'fixed':
+        return FixedClock()
+    if kind == 'adaptive':
+        return AdaptiveClock(**options)
+    raise ValueError(f"Unknown price clock: {kind}")
+
+
+def clock_report(transactions):
+    """
+    Summarizes ticks per lot and revenue for a list of operator transactions.
+    """
+    sold = [t for t in transactions if t['Merchant'] != 0]
+    ticks = sum(t.get('Ticks', 0) for t in transactions)
+    revenue = sum(t['SellPrice'] for t in sold)
+    return {
+        'lots': len(transactions),
+        'sold': len(sold),
+        'ticks': ticks,
+        'ticks_per_sold_lot': ticks / len(sold) if sold else 0,
+        'revenue': revenue,
+        'mean_price': revenue / len(sold) if sold else 0
+    }
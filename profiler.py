@@ -0,0 +1,130 @@
+import collections
+import csv
+import functools
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+PROFILE_DIR = os.path.join('results', 'profiles')
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}"
+
+
+def folded_stack(frame):
+    """
+    Formats a stack root first as 'module:function;module:function'.
+    """
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Samples one thread's stack every `interval` seconds for `window` seconds,
+    then writes the samples as folded stacks (input for flamegraph.pl or
+    speedscope) and the handler statistics as CSV.
+    """
+
+    def __init__(self, agent_name, thread_id, window, interval, directory):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.window = window
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.handler_stats = {}  # handler name -> [calls, wall time], filled by @profiled
+        self.stopped = threading.Event()
+        stamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        self.path_prefix = os.path.join(directory, f'{agent_name}_{stamp}')
+        os.makedirs(directory, exist_ok=True)
+
+    def run(self):
+        ends_at = time.time() + self.window
+        while not self.stopped.wait(self.interval) and time.time() < ends_at:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break  # The agent's loop has exited
+            self.stacks[folded_stack(frame)] += 1
+            del frame
+        self.stopped.set()
+        self.write()
+
+    def write(self):
+        with open(self.path_prefix + '.folded', 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+        with open(self.path_prefix + '_handlers.csv', 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Handler', 'Calls', 'WallTime', 'MeanTime'])
+            for name, (calls, wall_time) in sorted(self.handler_stats.items(), key=lambda item: -item[1][1]):
+                writer.writerow([name, calls, f'{wall_time:.6f}', f'{wall_time / calls:.6f}'])
+
+
+def profiled(handler):
+    """
+    Counts calls and wall time of an agent handler while a profiling window
+    is open. When profiling is off the only cost is one attribute check.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None or profiler.stopped.is_set():
+            return handler(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return handler(self, *args, **kwargs)
+        finally:
+            stats = profiler.handler_stats.setdefault(handler.__name__, [0, 0.0])
+            stats[0] += 1
+            stats[1] += time.perf_counter() - start
+    return wrapper
+
+
+class Profiling:
+    """
+    Mixin letting a running agent be profiled on demand through its proxy:
+        agent.start_profiling(window=10)
+    Output goes to `directory` as <agent>_<time>.folded and <agent>_<time>_handlers.csv.
+    """
+
+    profiler = None
+
+    def start_profiling(self, window=10, interval=0.005, directory=PROFILE_DIR):
+        """
+        Opens a profiling window. Proxy calls run in the agent's loop thread,
+        which is the thread sampled. Returns the output path prefix.
+        """
+        if self.profiler is not None and not self.profiler.stopped.is_set():
+            return self.profiler.path_prefix
+        self.profiler = SamplingProfiler(self.name, threading.get_ident(), window, interval, directory)
+        self.profiler.start()
+        return self.profiler.path_prefix
+
+    def stop_profiling(self):
+        """
+        Closes the profiling window early; the output is written at once.
+        """
+        if self.profiler is not None:
+            self.profiler.stopped.set()
+            self.profiler.join()
+
+
+if __name__ == '__main__':
+    # Profile an agent of a running session, e.g.
+    #   python profiler.py 127.0.0.1:41234 OperatorInfinite 30
+    # The name server address is printed by toyAgentv2.py at startup.
+    from osbrain import NSProxy
+    if len(sys.argv) < 3:
+        print("Usage: python profiler.py <name_server_address> <agent_name> [window_seconds]")
+        sys.exit(1)
+    window = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    agent = NSProxy(nsaddr=sys.argv[1]).proxy(sys.argv[2])
+    path_prefix = agent.start_profiling(window)
+    print(f"Profiling {sys.argv[2]} for {window:g} s; output in {path_prefix}.folded and {path_prefix}_handlers.csv")
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import pickle
+
+CACHE_DIR = '.run_cache'
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Source files whose behavior determines a run's outcome
+CODE_FILES = ['operators.py', 'merchants.py', 'strategies.py', 'supply.py', 'pricing.py']
+
+# Config keys that change how a run is executed or stored, not its outcome
+RUNTIME_KEYS = {
+    'checkpoint_interval', 'checkpoint_file', 'run_cache', 'cache_dir', 'cache_max_mb',
+    'log_mode', 'log_level', 'log_rate_limit', 'log_dir'
+}
+
+# Values assumed by toyAgentv2.py when a key is missing from config.txt
+CONFIG_DEFAULTS = {
+    'operator_type': '1',
+    'total_fish_to_sell': '10',
+    'num_basic_merchants': '0',
+    'num_rich_merchants': '0',
+    'num_poor_merchants': '0',
+    'lot_supply': 'round_robin',
+    'price_clock': 'fixed',
+    'basic_strategy': 'basic',
+    'rich_strategy': 'rich',
+    'poor_strategy': 'poor',
+    'demand_index': 'on'
+}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(base_dir='.'):
+    """
+    Hashes the simulation source, so any code change invalidates cached runs.
+    """
+    digest = hashlib.sha256()
+    for name in CODE_FILES:
+        digest.update(name.encode('utf-8'))
+        digest.update(file_digest(os.path.join(base_dir, name)).encode('ascii'))
+    return digest.hexdigest()
+
+
+def normalize_config(config):
+    """
+    Drops runtime-only keys and fills in defaults, so equivalent configs
+    produce the same cache key.
+    """
+    normalized = {**CONFIG_DEFAULTS, **{key: str(value).strip() for key, value in config.items()}}
+    for key in RUNTIME_KEYS:
+        normalized.pop(key, None)
+    # Finite-only setting has no effect on infinite operators
+    if normalized['operator_type'] in ('1', '3'):
+        normalized.pop('total_fish_to_sell')
+    # A lot file counts by content, not by path
+    if normalized.get('lot_file'):
+        normalized['lot_file'] = file_digest(normalized['lot_file'])
+    return normalized
+
+
+def cache_key(config, base_dir='.'):
+    payload = json.dumps({'config': normalize_config(config), 'code': code_version(base_dir)}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RunCache:
+    """
+    Content-addressed on-disk cache of run outcomes with size-bounded LRU
+    eviction. Entries are keyed by cache_key(config); reading an entry
+    refreshes its modification time, and the oldest entries are evicted
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def get(self, key):
+        """
+        Returns the cached outcome for `key`, or None on a miss.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as file:
+                outcome = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)  # Mark as recently used
+        return outcome
+
+    def put(self, key, outcome):
+        path = self.entry_path(key)
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(outcome, file)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
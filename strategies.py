@@ -0,0 +1,145 @@
+# Threshold used when a lot has no quality or an unknown one
+DEFAULT_THRESHOLD = 20
+# Share of the old threshold kept after buying preferred fish
+THRESHOLD_DECAY = 0.8
+
+
+class Strategy:
+    """
+    A merchant bidding strategy.
+
+    decide(lot, state) -> bool is a pure function of an auction_info message
+    (product_type, quality, price) and a merchant's state (see
+    Merchant.strategy_state). decide_batch(lot, states) evaluates many
+    merchants for one tick, and on_purchase(state, product_type, quality, price)
+    adapts the state after a confirmed purchase. price_limit(lot, state), if
+    given, returns the highest price decide accepts when the budget allows
+    (None for no price); fast_path.py uses it to skip the clock.
+    """
+
+    def __init__(self, name, decide, decide_batch=None, on_purchase=None, price_limit=None):
+        self.name = name
+        self.decide = decide
+        self.decide_batch = decide_batch or self.decide_each
+        self.on_purchase = on_purchase or keep_state
+        self.price_limit = price_limit
+
+    def decide_each(self, lot, states):
+        decide = self.decide
+        return [decide(lot, state) for state in states]
+
+
+STRATEGIES = {}
+
+
+def register_strategy(name, decide, decide_batch=None, on_purchase=None, price_limit=None):
+    """
+    Registers a strategy under `name` so merchants can select it.
+    """
+    STRATEGIES[name] = Strategy(name, decide, decide_batch, on_purchase, price_limit)
+    return STRATEGIES[name]
+
+
+def get_strategy(name):
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown merchant strategy: {name}") from None
+
+
+def keep_state(state, product_type, quality, price):
+    pass
+
+
+def basic_limit(lot, state):
+    """
+    Highest price the standard logic pays for a lot: the quality threshold
+    for preferred fish, half of it for a first fish of another type.
+    Returns None when the merchant would not buy at any price.
+    """
+    product_type = lot['product_type']
+    threshold = state['preferred_price_thresholds'].get(lot.get('quality'), DEFAULT_THRESHOLD)
+    if product_type == state['preference']:
+        return threshold
+    if state['inventory_counts'][product_type] == 0:
+        return threshold / 2
+    return None
+
+
+def decide_basic(lot, state):
+    """
+    Buys preferred fish up to the quality threshold, and a first fish of any
+    other type at half the threshold.
+    """
+    price = lot['price']
+    if state['budget'] < price:
+        return False
+    limit = basic_limit(lot, state)
+    return limit is not None and price <= limit
+
+
+def decide_basic_batch(lot, states):
+    price = lot['price']
+    product_type = lot['product_type']
+    quality = lot.get('quality')
+    decisions = []
+    for state in states:
+        if state['budget'] < price:
+            decisions.append(False)
+            continue
+        threshold = state['preferred_price_thresholds'].get(quality, DEFAULT_THRESHOLD)
+        if product_type == state['preference']:
+            decisions.append(price <= threshold)
+        else:
+            decisions.append(state['inventory_counts'][product_type] == 0 and price <= threshold / 2)
+    return decisions
+
+
+def lower_threshold(state, product_type, quality, price):
+    """
+    Cuts the quality threshold by 20% (down to its minimum) after buying preferred fish.
+    """
+    thresholds = state['preferred_price_thresholds']
+    if product_type == state['preference'] and quality in thresholds:
+        thresholds[quality] = max(thresholds[quality] * THRESHOLD_DECAY, state['preferred_price_minimums'][quality])
+
+
+def rich_limit(lot, state):
+    if lot['product_type'] == state['preference']:
+        return state['preferred_price_threshold']
+    return basic_limit(lot, state)
+
+
+def decide_rich(lot, state):
+    """
+    Always accepts up to preferred_price_threshold for preferred fish and
+    follows the standard logic for the rest.
+    """
+    price = lot['price']
+    if state['budget'] < price:
+        return False
+    if lot['product_type'] == state['preference']:
+        return price <= state['preferred_price_threshold']
+    return decide_basic(lot, state)
+
+
+def decide_poor(lot, state):
+    """
+    Buys any fish, but only at heavy discounts (preferred_price_threshold).
+    """
+    price = lot['price']
+    return state['budget'] >= price and price <= state['preferred_price_threshold']
+
+
+def poor_limit(lot, state):
+    return state['preferred_price_threshold']
+
+
+def decide_poor_batch(lot, states):
+    price = lot['price']
+    return [state['budget'] >= price and price <= state['preferred_price_threshold'] for state in states]
+
+
+register_strategy('basic', decide_basic, decide_basic_batch, lower_threshold, basic_limit)
+register_strategy('rich', decide_rich, price_limit=rich_limit)
+register_strategy('poor', decide_poor, decide_poor_batch, lower_threshold, poor_limit)
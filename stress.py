@@ -0,0 +1,240 @@
+import argparse
+import pickle
+import threading
+import time
+import zmq
+from osbrain import run_nameserver, run_agent
+from operators import OperatorFinite
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def zmq_endpoint(address):
+    """
+    Turns an osBrain agent address into a ZeroMQ endpoint.
+    """
+    return f'{address.transport}://{address.address}'
+
+
+def decode_published(data):
+    """
+    Decodes a message from the operator's PUB socket. osBrain prefixes
+    pickled messages with their topic and a 0x80 separator.
+    """
+    return pickle.loads(data[data.index(b'\x80') + 1:])
+
+
+class LoadGenerator(threading.Thread):
+    """
+    Drives the operator's bid path with synthetic bidders. Each bidder is a
+    bare PUSH socket to the bid channel. One SUB socket watches the publish
+    channel, and the first tick of every lot gets `bids_per_tick` bids.
+    """
+
+    def __init__(self, context, publish_address, bid_address, num_bidders):
+        super().__init__(daemon=True)
+        self.context = context
+        self.publish_endpoint = zmq_endpoint(publish_address)
+        self.bid_endpoint = zmq_endpoint(bid_address)
+        self.num_bidders = num_bidders
+        self.bids_per_tick = 1
+        self.lock = threading.Lock()
+        self.running = True
+        self.ready = threading.Event()
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self.lock:
+            self.tick_times = {}
+            self.latencies = []
+            self.bids_sent = 0
+            self.confirmations = 0
+            self.rejections = 0
+            self.started_at = time.time()
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'elapsed': time.time() - self.started_at,
+                'bids_sent': self.bids_sent,
+                'confirmations': self.confirmations,
+                'rejections': self.rejections,
+                'latencies': list(self.latencies)
+            }
+
+    def run(self):
+        subscriber = self.context.socket(zmq.SUB)
+        subscriber.connect(self.publish_endpoint)
+        subscriber.setsockopt(zmq.SUBSCRIBE, b'')
+        bidders = []
+        for _ in range(self.num_bidders):
+            bidder = self.context.socket(zmq.PUSH)
+            bidder.connect(self.bid_endpoint)
+            bidders.append(bidder)
+        self.ready.set()
+        while self.running:
+            if not subscriber.poll(100):
+                continue
+            message = decode_published(subscriber.recv())
+            with self.lock:
+                self.on_operator_message(message, bidders)
+        for socket in [subscriber] + bidders:
+            socket.close(linger=0)
+
+    def on_operator_message(self, message, bidders):
+        message_type = message.get('message_type')
+        product_number = message.get('product_number')
+        if message_type == 'auction_info':
+            if product_number in self.tick_times:
+                return  # Only the first tick of each lot is bid on
+            self.tick_times[product_number] = time.time()
+            count = min(self.bids_per_tick, self.num_bidders)
+            for i in range(count):
+                bidders[i].send(pickle.dumps({'merchant_id': f'bidder_{i}', 'product_number': product_number}, -1))
+            self.bids_sent += count
+        elif message_type == 'confirmation':
+            self.confirmations += 1
+            tick_time = self.tick_times.get(product_number)
+            if tick_time is not None:
+                self.latencies.append(time.time() - tick_time)
+        elif message_type == 'rejection':
+            self.rejections += len(message.get('merchant_ids', []))
+
+
+class LoadSubscribers(threading.Thread):
+    """
+    Passive SUB sockets on the publish channel. Records when each one
+    receives every auction_info message, to measure fan-out.
+    """
+
+    def __init__(self, context, publish_address, num_subscribers):
+        super().__init__(daemon=True)
+        self.context = context
+        self.publish_endpoint = zmq_endpoint(publish_address)
+        self.num_subscribers = num_subscribers
+        self.lock = threading.Lock()
+        self.running = True
+        self.ready = threading.Event()
+        self.arrivals = {}
+
+    def run(self):
+        poller = zmq.Poller()
+        sockets = []
+        for _ in range(self.num_subscribers):
+            socket = self.context.socket(zmq.SUB)
+            socket.connect(self.publish_endpoint)
+            socket.setsockopt(zmq.SUBSCRIBE, b'')
+            poller.register(socket, zmq.POLLIN)
+            sockets.append(socket)
+        self.ready.set()
+        while self.running:
+            for socket, _ in poller.poll(100):
+                received_at = time.time()
+                message = decode_published(socket.recv())
+                if message.get('message_type') == 'auction_info':
+                    with self.lock:
+                        key = (message['product_number'], message['price'])
+                        self.arrivals.setdefault(key, []).append(received_at)
+        for socket in sockets:
+            socket.close(linger=0)
+
+    def fan_out_spreads(self):
+        """
+        Time between the first and last subscriber receiving each message.
+        """
+        with self.lock:
+            spreads = [max(times) - min(times) for times in self.arrivals.values()]
+            self.arrivals = {}
+        return spreads
+
+
+def run_stress(num_bidders=64, num_subscribers=16, lots_per_step=20, tick_interval=0.05,
+               bid_window=0.05, saturation_latency=1.0):
+    """
+    Doubles the bids per tick step by step until tick-to-confirmation p99
+    latency exceeds `saturation_latency` or throughput stops growing.
+    Returns one result dict per step.
+    """
+    ns = run_nameserver()
+    operator = run_agent('StressOperator', base=OperatorFinite, attributes={'total_fish_to_sell': 10 ** 9})
+    operator.set_attr(tick_interval=tick_interval, bid_window=bid_window)
+    publish_address = operator.addr('publish_channel')
+    bid_address = operator.addr('bid_channel')
+
+    context = zmq.Context()
+    generator = LoadGenerator(context, publish_address, bid_address, num_bidders)
+    subscribers = LoadSubscribers(context, publish_address, num_subscribers)
+    generator.start()
+    subscribers.start()
+    generator.ready.wait()
+    subscribers.ready.wait()
+    time.sleep(1)  # Let the SUB connections settle before the first lot
+
+    results = []
+    operator.start_auction()
+    bids_per_tick = 1
+    while bids_per_tick <= num_bidders:
+        generator.bids_per_tick = bids_per_tick
+        generator.reset_metrics()
+        subscribers.fan_out_spreads()
+        bids_before = operator.get_attr('bid_count')
+        stale_before = operator.get_attr('stale_bid_count')
+        duplicate_before = operator.get_attr('duplicate_bid_count')
+        max_queue_depth = 0
+        while generator.metrics()['confirmations'] < lots_per_step:
+            time.sleep(0.05)
+            # Bids sent but not yet read by the operator
+            in_flight = generator.metrics()['bids_sent'] - (operator.get_attr('bid_count') - bids_before)
+            max_queue_depth = max(max_queue_depth, in_flight)
+        metrics = generator.metrics()
+        spreads = subscribers.fan_out_spreads()
+        processed = operator.get_attr('bid_count') - bids_before
+        result = {
+            'bids_per_tick': bids_per_tick,
+            'throughput': processed / metrics['elapsed'],
+            'max_queue_depth': max_queue_depth,
+            'rejected': metrics['rejections'],
+            'late': operator.get_attr('stale_bid_count') - stale_before,
+            'duplicates': operator.get_attr('duplicate_bid_count') - duplicate_before,
+            'p50': percentile(metrics['latencies'], 0.5),
+            'p99': percentile(metrics['latencies'], 0.99),
+            'fan_out_p99': percentile(spreads, 0.99)
+        }
+        results.append(result)
+        print(
+            f"{bids_per_tick:5d} bids/tick: {result['throughput']:9.1f} bids/s, queue {result['max_queue_depth']:4d}, "
+            f"rejected {result['rejected']:5d}, late {result['late']:5d}, dup {result['duplicates']:3d}, "
+            f"latency p50 {result['p50'] * 1000:7.1f} ms p99 {result['p99'] * 1000:7.1f} ms, "
+            f"fan-out p99 {result['fan_out_p99'] * 1000:6.1f} ms"
+        )
+        if result['p99'] > saturation_latency:
+            print("Saturated: p99 latency above the limit.")
+            break
+        if len(results) > 1 and result['throughput'] < results[-2]['throughput']:
+            print("Saturated: throughput stopped growing.")
+            break
+        bids_per_tick *= 2
+
+    generator.running = subscribers.running = False
+    generator.join()
+    subscribers.join()
+    context.term()
+    ns.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Saturation test for the operator's bid path.")
+    parser.add_argument('--bidders', type=int, default=64, help='synthetic bidders (max bids per tick)')
+    parser.add_argument('--subscribers', type=int, default=16, help='extra subscribers on the publish channel')
+    parser.add_argument('--lots', type=int, default=20, help='lots sold per load step')
+    parser.add_argument('--tick', type=float, default=0.05, help='operator tick interval in seconds')
+    parser.add_argument('--window', type=float, default=0.05, help='operator bid window in seconds')
+    parser.add_argument('--max-latency', type=float, default=1.0, help='p99 latency treated as saturation')
+    args = parser.parse_args()
+    run_stress(args.bidders, args.subscribers, args.lots, args.tick, args.window, args.max_latency)
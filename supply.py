@@ -0,0 +1,195 @@
+import csv
+import itertools
+import random
+import re
+import struct
+
+FISH_TYPES = ['H', 'S', 'T']
+FISH_QUALITIES = ['good', 'normal', 'bad']
+
+# Default Dutch-clock price schedule for a lot
+START_PRICE = 30
+BOTTOM_PRICE = 10
+PRICE_DECREMENT = 2
+
+# Binary lot record: type (1 char), quality index (255 = none), start, bottom, decrement
+LOT_RECORD = struct.Struct('<cBHHH')
+NO_QUALITY = 255
+
+
+def make_lot(fish_type, quality=None, start_price=START_PRICE, bottom_price=BOTTOM_PRICE,
+             price_decrement=PRICE_DECREMENT):
+    """
+    Builds a lot as handed from a supply to the operator.
+    """
+    return {
+        'fish_type': fish_type,
+        'quality': quality,
+        'start_price': start_price,
+        'bottom_price': bottom_price,
+        'price_decrement': price_decrement
+    }
+
+
+class LotSupply:
+    """
+    Base class for lot supplies. Iterating a supply yields lots lazily, so
+    the operator can pull them on demand without holding the whole catch.
+    """
+
+    def __iter__(self):
+        raise NotImplementedError
+
+
+class RoundRobinSupply(LotSupply):
+    """
+    Cycles through the fish types and picks the quality uniformly at random.
+    This is the operators' original behavior.
+    """
+
+    def __init__(self, fish_types=FISH_TYPES, qualities=None, seed=None):
+        self.fish_types = list(fish_types)
+        self.qualities = list(qualities) if qualities else None
+        self.seed = seed
+
+    def __iter__(self):
+        rng = random.Random(self.seed)
+        for fish_type in itertools.cycle(self.fish_types):
+            quality = rng.choice(self.qualities) if self.qualities else None
+            yield make_lot(fish_type, quality)
+
+
+class StochasticSupply(LotSupply):
+    """
+    Draws each lot's type and quality independently from weighted mixes.
+    """
+
+    def __init__(self, type_mix, quality_mix=None, seed=None):
+        self.fish_types = list(type_mix)
+        self.type_weights = list(itertools.accumulate(type_mix.values()))
+        self.qualities = list(quality_mix) if quality_mix else None
+        self.quality_weights = list(itertools.accumulate(quality_mix.values())) if quality_mix else None
+        self.seed = seed
+
+    def __iter__(self):
+        rng = random.Random(self.seed)
+        while True:
+            fish_type = rng.choices(self.fish_types, cum_weights=self.type_weights)[0]
+            quality = None
+            if self.qualities:
+                quality = rng.choices(self.qualities, cum_weights=self.quality_weights)[0]
+            yield make_lot(fish_type, quality)
+
+
+class CsvLotSupply(LotSupply):
+    """
+    Streams lots from a CSV file with a 'Type' column and optional 'Quality',
+    'StartPrice', 'BottomPrice' and 'PriceDecrement' columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, 'r', newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                yield make_lot(
+                    row['Type'],
+                    row.get('Quality') or None,
+                    int(row.get('StartPrice') or START_PRICE),
+                    int(row.get('BottomPrice') or BOTTOM_PRICE),
+                    int(row.get('PriceDecrement') or PRICE_DECREMENT)
+                )
+
+
+class BinaryLotSupply(LotSupply):
+    """
+    Streams lots from a file of fixed-size LOT_RECORD records.
+    """
+
+    def __init__(self, path, chunk_records=4096):
+        self.path = path
+        self.chunk_records = chunk_records
+
+    def __iter__(self):
+        with open(self.path, 'rb') as file:
+            while True:
+                chunk = file.read(LOT_RECORD.size * self.chunk_records)
+                if not chunk:
+                    break
+                for type_code, quality_index, start, bottom, decrement in LOT_RECORD.iter_unpack(chunk):
+                    quality = None if quality_index == NO_QUALITY else FISH_QUALITIES[quality_index]
+                    yield make_lot(type_code.decode('ascii'), quality, start, bottom, decrement)
+
+
+def write_binary_lots(path, lots):
+    """
+    Writes lots (any iterable) to a binary file readable by BinaryLotSupply.
+    """
+    with open(path, 'wb') as file:
+        for lot in lots:
+            quality = lot.get('quality')
+            quality_index = NO_QUALITY if quality is None else FISH_QUALITIES.index(quality)
+            file.write(LOT_RECORD.pack(
+                lot['fish_type'].encode('ascii'), quality_index,
+                lot.get('start_price', START_PRICE),
+                lot.get('bottom_price', BOTTOM_PRICE),
+                lot.get('price_decrement', PRICE_DECREMENT)
+            ))
+
+
+class ReplaySupply(LotSupply):
+    """
+    Replays the catch recorded in a merchant inventory report, in product order.
+    Only sold lots appear in a report, so unsold lots are not replayed.
+    """
+    LINE_PATTERN = re.compile(r'- Product (\d+): Type (\w+), Quality (N/A|\w+)')
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        # A report holds a single session, so indexing it by product is cheap
+        catch = {}
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                match = self.LINE_PATTERN.search(line)
+                if match:
+                    product_number, fish_type, quality = match.groups()
+                    catch[int(product_number)] = (fish_type, None if quality in ('N/A', 'None') else quality)
+        for product_number in sorted(catch):
+            yield make_lot(*catch[product_number])
+
+
+def parse_mix(text):
+    """
+    Parses a weight mix such as 'H=1, S=1, T=2' into a dict.
+    """
+    mix = {}
+    for item in text.split(','):
+        key, weight = item.split('=')
+        mix[key.strip()] = float(weight)
+    return mix
+
+
+def build_supply(kind='round_robin', fish_types=FISH_TYPES, qualities=None, seed=None,
+                 lot_file=None, type_mix=None, quality_mix=None):
+    """
+    Builds a lot supply from the options used in config.txt.
+    """
+    if kind == 'round_robin':
+        return RoundRobinSupply(fish_types, qualities, seed)
+    if kind == 'stochastic':
+        type_mix = parse_mix(type_mix) if type_mix else {fish_type: 1 for fish_type in fish_types}
+        if qualities:
+            quality_mix = parse_mix(quality_mix) if quality_mix else {quality: 1 for quality in qualities}
+        else:
+            quality_mix = None
+        return StochasticSupply(type_mix, quality_mix, seed)
+    if kind == 'csv':
+        return CsvLotSupply(lot_file)
+    if kind == 'binary':
+        return BinaryLotSupply(lot_file)
+    if kind == 'replay':
+        return ReplaySupply(lot_file)
+    raise ValueError(f"Unknown lot supply: {kind}")
@@ -1,17 +1,24 @@
 from osbrain import run_nameserver, run_agent, Agent
 import csv
+import os
 import random
+import sys
 from datetime import datetime
 import time
 import logging
 from threading import Thread
 from merchants import BasicMerchant, RichMerchant, PoorMerchant
+from pricing import clock_report
+from catalog import new_run_id, open_catalog, record_run
+from eventlog import LOG_LEVELS
+from checkpoint import CheckpointWriter, load_checkpoint, reconcile_merchants
+from run_cache import CACHE_DIR, RunCache, cache_key
+from supply import FISH_TYPES
 from operators import OperatorInfinite, OperatorFinite, OperatorInfiniteQuality, OperatorFiniteQuality
 
 
-
-# Set logging level to DEBUG for osBrain
-logging.getLogger('osbrain').setLevel(logging.DEBUG)
+# Directory receiving every run's reports and the run catalog
+RESULTS_DIR = 'results'
 
 
 
@@ -25,7 +32,7 @@ def read_config_file(file_path):
             for line in file:
                 line = line.strip()
                 if line and not line.startswith("#"):  # Ignore comments and empty lines
-                    key, value = line.split(":")
+                    key, value = line.split(":", 1)
                     config[key.strip()] = value.strip()
     except Exception as e:
         print(f"Error reading configuration file: {e}")
@@ -33,19 +40,18 @@ def read_config_file(file_path):
     return config
 
 
-def log_merchants_inventory(merchants):
+def log_merchants_inventory(merchant_states, run_id):
     """
     Logs each merchant's inventory details to a plain text file.
     """
-    date_str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    filename = f'merchant_inventory_{date_str}.txt'
+    filename = os.path.join(RESULTS_DIR, f'merchant_inventory_{run_id}.txt')
     
     with open(filename, 'w', encoding='utf-8') as file:
         file.write("=== Merchant Inventory Report ===\n\n")
-        for merchant in merchants:
-            merchant_name = merchant.get_name()  # Use the exposed method
-            merchant_budget = merchant.get_attr('budget')
-            inventory = merchant.get_attr('inventory')
+        for state in merchant_states:
+            merchant_name = state['name']
+            merchant_budget = state['budget']
+            inventory = state['inventory']
 
             # Write Merchant Header
             file.write(f"Merchant: {merchant_name}\n")
@@ -74,20 +80,20 @@ def log_merchants_inventory(merchants):
 
 
 
-def log_transactions(transactions):
-    date_str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    with open(f'log_{date_str}.csv', mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=['Product', 'SellPrice', 'Merchant'])
+def log_transactions(transactions, run_id):
+    filename = os.path.join(RESULTS_DIR, f'log_{run_id}.csv')
+    with open(filename, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=['Product', 'SellPrice', 'Merchant', 'Ticks'])
         writer.writeheader()
         for transaction in transactions:
             writer.writerow(transaction)
+    return filename
 
 
-def log_setup(merchants_info):
-    date_str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    with open(f'setup_{date_str}.csv', mode='w', newline='', encoding='utf-8') as file:
+def log_setup(merchants_info, run_id):
+    with open(os.path.join(RESULTS_DIR, f'setup_{run_id}.csv'), mode='w', newline='', encoding='utf-8') as file:
         # Include 'Type' in the fieldnames
-        writer = csv.DictWriter(file, fieldnames=['Merchant', 'Type', 'Preference', 'Budget'])
+        writer = csv.DictWriter(file, fieldnames=['Merchant', 'Type', 'Preference', 'Budget', 'Strategy'])
         writer.writeheader()
         for info in merchants_info:
             writer.writerow(info)
@@ -95,15 +101,95 @@ def log_setup(merchants_info):
 
 
 
+def finish_run(outcome, config, run_id):
+    """
+    Writes the reports for a finished (or cached) run and records it in the catalog.
+    """
+    log_merchants_inventory(outcome['merchant_states'], run_id)
+
+    transactions_path = log_transactions(outcome['transactions'], run_id)
+    report = clock_report(outcome['transactions'])
+    print(
+        f"Sold {report['sold']}/{report['lots']} lots in {report['ticks']} ticks "
+        f"({report['ticks_per_sold_lot']:.1f} per sold lot), revenue {report['revenue']} "
+        f"(mean price {report['mean_price']:.1f})."
+    )
+
+    # Register the run in the catalog
+    catalog = open_catalog(os.path.join(RESULTS_DIR, 'catalog.db'))
+    record_run(catalog, run_id, config, report, transactions_path)
+    catalog.close()
+    print(f"Run {run_id} recorded in the catalog.")
+
+
+def take_checkpoint(writer, operator, merchants, config, run_id):
+    """
+    Collects operator and merchant state and hands it to the background writer.
+    The operator is read first; see checkpoint.reconcile_merchants.
+    """
+    operator_state = operator.checkpoint_state(writer.transactions_submitted)
+    new_transactions = operator_state.pop('transactions')
+    merchant_states = {merchant.get_name(): merchant.checkpoint_state() for merchant in merchants}
+    writer.submit(
+        {'config': config, 'run_id': run_id, 'operator': operator_state, 'merchants': merchant_states},
+        new_transactions
+    )
+
+
     # Main program execution
 
 
 if __name__ == '__main__':
-    ns = run_nameserver()
+    # Resume mode: python toyAgentv2.py --resume [checkpoint_file]
+    resume = len(sys.argv) > 1 and sys.argv[1] == '--resume'
+    resume_state = None
 
     # Read configuration file
     config_file = "config.txt"
     config = read_config_file(config_file)
+    checkpoint_file = config.get('checkpoint_file', os.path.join(RESULTS_DIR, 'checkpoint.pkl'))
+    if resume:
+        checkpoint_file = sys.argv[2] if len(sys.argv) > 2 else checkpoint_file
+        if not os.path.exists(checkpoint_file):
+            print(f"No checkpoint found at '{checkpoint_file}'.")
+            exit(1)
+        # The session continues with the configuration it was started with
+        resume_state = load_checkpoint(checkpoint_file)
+        config = resume_state['config']
+        run_id = resume_state['run_id']
+        resume_state['operator']['transactions'] = resume_state['transactions']
+        reconcile_merchants(resume_state['merchants'].values(), resume_state['operator']['fish_index'])
+        print(f"Resuming run {run_id} after Fish {resume_state['operator']['fish_index']}.")
+    else:
+        run_id = new_run_id()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    checkpoint_interval = float(config.get('checkpoint_interval', 30))
+
+    # Agent logging (see eventlog.py); the level also applies to osBrain itself
+    log_options = {
+        'mode': config.get('log_mode', 'queued'),
+        'level': config.get('log_level', 'info'),
+        'rate_limit': int(config.get('log_rate_limit', 0)),
+        'directory': config.get('log_dir')
+    }
+    logging.getLogger('osbrain').setLevel(LOG_LEVELS[log_options['level']])
+
+    # A seeded run's outcome is fully determined by its configuration and
+    # the code, so check the run cache before launching any agents
+    run_cache = None
+    if not resume and config.get('seed') and config.get('run_cache', 'on') == 'on':
+        run_cache = RunCache(config.get('cache_dir', CACHE_DIR), int(config.get('cache_max_mb', 256)) * 1024 * 1024)
+        run_key = cache_key(config)
+        outcome = run_cache.get(run_key)
+        if outcome is not None:
+            print("Cache hit: reusing the outcome of an identical run.")
+            log_setup(outcome['merchants_info'], run_id)
+            finish_run(outcome, config, run_id)
+            exit()
+
+    ns = run_nameserver()
+    # Running agents can be profiled with: python profiler.py <address> <agent_name>
+    print(f"Name server running at {ns.addr()}.")
 
     # Extract inputs
     operator_type = int(config.get('operator_type', 1))
@@ -111,27 +197,48 @@ if __name__ == '__main__':
     num_basic_merchants = int(config.get('num_basic_merchants', 0))
     num_rich_merchants = int(config.get('num_rich_merchants', 0))
     num_poor_merchants = int(config.get('num_poor_merchants', 0))
+    seed = int(config['seed']) if config.get('seed') else None
 
     operator = None
     use_quality = False
 
+    # Lot supply options shared by every operator type
+    supply_options = {
+        'kind': config.get('lot_supply', 'round_robin'),
+        'lot_file': config.get('lot_file'),
+        'type_mix': config.get('type_mix'),
+        'quality_mix': config.get('quality_mix'),
+        'seed': seed
+    }
+
+    # Price clock options shared by every operator type
+    clock_options = {'kind': config.get('price_clock', 'fixed')}
+    if clock_options['kind'] == 'adaptive':
+        for key in ('history', 'margin', 'fine_band', 'coarse_step'):
+            if config.get(f'clock_{key}'):
+                clock_options[key] = int(config[f'clock_{key}'])
+
+    operator_attributes = {'supply_options': supply_options, 'clock_options': clock_options, 'log_options': log_options}
+    if resume_state:
+        operator_attributes['resume_state'] = resume_state['operator']
+
     # Initialize the operator based on configuration
     if operator_type == 1:
-        operator = run_agent('OperatorInfinite', base=OperatorInfinite)
+        operator = run_agent('OperatorInfinite', base=OperatorInfinite, attributes=operator_attributes)
     elif operator_type == 2:
         operator = run_agent(
             'OperatorFinite',
             base=OperatorFinite,
-            attributes={'total_fish_to_sell': total_fish_to_sell}
+            attributes={'total_fish_to_sell': total_fish_to_sell, **operator_attributes}
         )
     elif operator_type == 3:
-        operator = run_agent('OperatorInfiniteQuality', base=OperatorInfiniteQuality)
+        operator = run_agent('OperatorInfiniteQuality', base=OperatorInfiniteQuality, attributes=operator_attributes)
         use_quality = True
     elif operator_type == 4:
         operator = run_agent(
             'OperatorFiniteQuality',
             base=OperatorFiniteQuality,
-            attributes={'total_fish_to_sell': total_fish_to_sell}
+            attributes={'total_fish_to_sell': total_fish_to_sell, **operator_attributes}
         )
         use_quality = True
     else:
@@ -148,12 +255,19 @@ if __name__ == '__main__':
     publish_address = operator.addr('publish_channel')
     bid_address = operator.addr('bid_channel')
 
-    def create_merchants(num_merchants, merchant_class, budget):
+    # Merchant preferences are drawn from the seed too, when one is set
+    preference_rng = random.Random(seed) if seed is not None else None
+
+    def create_merchants(num_merchants, merchant_class, budget, strategy):
         """Creates a specified number of merchants and connects them to the operator."""
         for i in range(1, num_merchants + 1):
             merchant_name = f'{merchant_class.__name__}_{i}'
-            merchant = run_agent(merchant_name, base=merchant_class)
-            merchant.set_attr(budget=budget)
+            merchant = run_agent(merchant_name, base=merchant_class, attributes={'log_options': log_options})
+            merchant.set_attr(budget=budget, strategy=strategy)
+            if preference_rng:
+                merchant.set_attr(preference=preference_rng.choice(FISH_TYPES))
+            if resume_state and merchant_name in resume_state['merchants']:
+                merchant.restore_state(resume_state['merchants'][merchant_name])
             merchant.connect(publish_address, handler='on_operator_message')
             merchant.bind('PUSH', alias='bid_channel')
             merchant.connect(bid_address, alias='bid_channel')
@@ -162,23 +276,59 @@ if __name__ == '__main__':
                 'Merchant': merchant_name,
                 'Type': merchant_class.__name__,
                 'Preference': merchant.get_attr('preference'),
-                'Budget': merchant.get_attr('budget')
+                'Budget': merchant.get_attr('budget'),
+                'Strategy': merchant.get_attr('strategy')
             })
 
     # Use inputs from the config file
-    create_merchants(num_basic_merchants, BasicMerchant, 100)
-    create_merchants(num_rich_merchants, RichMerchant, 500)
-    create_merchants(num_poor_merchants, PoorMerchant, 50)
+    create_merchants(num_basic_merchants, BasicMerchant, 100, config.get('basic_strategy', 'basic'))
+    create_merchants(num_rich_merchants, RichMerchant, 500, config.get('rich_strategy', 'rich'))
+    create_merchants(num_poor_merchants, PoorMerchant, 50, config.get('poor_strategy', 'poor'))
+
+    # Let the operator skip lots no merchant can buy
+    if config.get('demand_index', 'on') == 'on':
+        operator.register_merchants({
+            merchant.get_name(): {**merchant.strategy_state(), 'strategy': merchant.get_attr('strategy')}
+            for merchant in merchants
+        })
 
     # Log setup and start auction
-    log_setup(merchants_info)
+    log_setup(merchants_info, run_id)
     operator.start_auction()
 
-    # Wait for the auction to finish
+    # Checkpoint the session periodically while waiting for the auction to finish
+    checkpoint_writer = None
+    if checkpoint_interval > 0:
+        checkpoint_writer = CheckpointWriter(checkpoint_file, resume=resume)
+    last_checkpoint = time.time()
     while operator.get_attr('running'):
         time.sleep(1)
+        if checkpoint_writer and time.time() - last_checkpoint >= checkpoint_interval:
+            take_checkpoint(checkpoint_writer, operator, merchants, config, run_id)
+            last_checkpoint = time.time()
+
+    if checkpoint_writer:
+        # The session finished, so there is nothing left to resume
+        checkpoint_writer.close(remove=True)
 
-    log_merchants_inventory(merchants)
+    # Write out queued agent logs before the reports
+    operator.flush_log()
+    for merchant in merchants:
+        merchant.flush_log()
+
+    merchant_states = []
+    for merchant in merchants:
+        state = merchant.checkpoint_state()
+        state['name'] = merchant.get_name()
+        merchant_states.append(state)
+    outcome = {
+        'merchants_info': merchants_info,
+        'merchant_states': merchant_states,
+        'transactions': operator.get_attr('transactions')
+    }
+    if run_cache:
+        run_cache.put(run_key, outcome)
+    finish_run(outcome, config, run_id)
 
     # Shutdown all agents
     operator.shutdown()